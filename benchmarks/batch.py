@@ -0,0 +1,160 @@
+# 批量下载基准：启动本地替身服务器，在子进程中用下载引擎跑一批可复现的专利号
+# 报告每分钟专利数、单个专利耗时的p50/p95和峰值内存
+# 用法:
+#     python benchmarks/batch.py --count 200 --latency 0.05 --error-429 0.02
+#     python benchmarks/batch.py --mode browser     # 需要Chrome，找不到时跳过
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from stand_in_server import StandInServer, add_options_arguments, options_from_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHROME_NAMES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome")
+
+# 在全新子进程中运行引擎，峰值内存只统计下载进程本身
+PROBE = r"""
+import sys, json, time
+from config import Config
+from engine import PatentEngine
+
+config = Config(CONFIG_FILE)
+config.config.update(OVERRIDES)
+with open(PATENTS_FILE, 'r', encoding='utf-8') as f:
+    patents = [line.strip() for line in f if line.strip()]
+
+counts = {"success": 0, "failed": 0}
+def listener(event, *args):
+    if event in counts:
+        counts[event] += 1
+
+start = time.perf_counter()
+engine = PatentEngine(patents, config, listener)
+engine.run()
+elapsed = time.perf_counter() - start
+
+try:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+except ImportError:
+    try:
+        import psutil
+        peak_mb = psutil.Process().memory_info().peak_wset / 1024 / 1024
+    except Exception:
+        peak_mb = None
+
+print(json.dumps({"elapsed": elapsed, "succeeded": counts["success"],
+                  "failed": counts["failed"], "peak_rss_mb": peak_mb}))
+"""
+
+
+def chrome_available():
+    return any(shutil.which(name) for name in CHROME_NAMES)
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def mode_overrides(mode):
+    """http：只用无浏览器解析；browser：只用浏览器策略"""
+    if mode == "browser":
+        return {"http_resolver": False, "browser_strategies": True}
+    return {"http_resolver": True, "browser_strategies": False}
+
+
+def run_batch(args, server, work_dir):
+    download_dir = os.path.join(work_dir, "downloads")
+    patents_file = os.path.join(work_dir, "patents.txt")
+    with open(patents_file, 'w', encoding='utf-8') as f:
+        f.write("\n".join(f"US{args.first + i}" for i in range(args.count)))
+
+    overrides = dict(server.config_overrides())
+    overrides.update(mode_overrides(args.mode))
+    overrides.update({
+        "download_dir": download_dir,
+        "workers": args.workers,
+        "download_workers": args.download_workers,
+        "delay": args.delay,
+        "rate_max": args.rate_max,
+        "retry_count": args.retry_count,
+        "url_cache": False,
+        "url_cache_file": os.path.join(work_dir, "url_cache.db"),
+        "metrics_file": "metrics.json",
+    })
+
+    code = (f"CONFIG_FILE = {os.path.join(work_dir, 'config.json')!r}\n"
+            f"PATENTS_FILE = {patents_file!r}\n"
+            f"OVERRIDES = {overrides!r}\n{PROBE}")
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    output = subprocess.run([sys.executable, "-c", code], cwd=work_dir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+
+    # 单个专利耗时取自引擎写出的逐专利指标
+    latencies = []
+    patent_log = os.path.join(download_dir, "patent_metrics.jsonl")
+    if os.path.exists(patent_log):
+        with open(patent_log, 'r', encoding='utf-8') as f:
+            latencies = [json.loads(line)["elapsed"] for line in f if line.strip()]
+
+    elapsed = result["elapsed"]
+    return {
+        "mode": args.mode,
+        "patents": args.count,
+        "succeeded": result["succeeded"],
+        "failed": result["failed"],
+        "elapsed": round(elapsed, 3),
+        "patents_per_min": round(args.count * 60 / elapsed, 2) if elapsed else None,
+        "latency_p50": percentile(latencies, 0.5),
+        "latency_p95": percentile(latencies, 0.95),
+        "peak_rss_mb": round(result["peak_rss_mb"], 1) if result["peak_rss_mb"] is not None else None,
+        "server": dict(server.counters),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="批量下载基准（本地替身服务器）")
+    parser.add_argument("--mode", choices=("http", "browser"), default="http", help="解析方式")
+    parser.add_argument("--count", type=int, default=100, help="专利数量")
+    parser.add_argument("--first", type=int, default=1000000, help="起始编号")
+    parser.add_argument("--workers", type=int, default=4, help="解析线程数")
+    parser.add_argument("--download-workers", type=int, default=4, help="下载线程数")
+    parser.add_argument("--delay", type=float, default=0.1, help="初始请求间隔（秒）")
+    parser.add_argument("--rate-max", type=float, default=200.0, help="每个主机的最大请求速率")
+    parser.add_argument("--retry-count", type=int, default=3, help="每个策略的重试次数")
+    parser.add_argument("--output", help="把结果JSON追加写入该文件")
+    add_options_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.mode == "browser" and not chrome_available():
+        print(json.dumps({"mode": args.mode, "skipped": "未找到Chrome"}, ensure_ascii=False))
+        return 0
+
+    server = StandInServer(options_from_args(args)).start()
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            report = run_batch(args, server, work_dir)
+    finally:
+        server.stop()
+
+    line = json.dumps(report, ensure_ascii=False)
+    print(line)
+    if args.output:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
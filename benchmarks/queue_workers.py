@@ -0,0 +1,145 @@
+# 任务队列多进程基准：启动本地替身服务器，把一批专利号加入共享任务队列，
+# 再启动多个 cli.py --work 工作进程同时处理，可中途强制结束一个进程验证租约过期后任务被接管
+# 报告各状态的任务数、重复下载次数和每分钟专利数
+# 用法:
+#     python benchmarks/queue_workers.py --count 100 --processes 3
+#     python benchmarks/queue_workers.py --count 100 --processes 3 --kill-after 2 --lease 5
+import os
+import sys
+import json
+import time
+import signal
+import sqlite3
+import argparse
+import tempfile
+import subprocess
+from collections import Counter
+
+from stand_in_server import StandInServer, add_options_arguments, options_from_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "cli.py")
+
+
+def write_config(args, server, work_dir):
+    config = dict(server.config_overrides())
+    config.update({
+        "download_dir": os.path.join(work_dir, "downloads"),
+        "http_resolver": True,
+        "browser_strategies": False,
+        "workers": args.workers,
+        "download_workers": args.download_workers,
+        "delay": args.delay,
+        "rate_max": args.rate_max,
+        "url_cache": False,
+    })
+    config_file = os.path.join(work_dir, "config.json")
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    return config_file
+
+
+def start_worker(args, config_file, work_dir, index):
+    """每个工作进程使用独立的工作目录（链接缓存等本地文件）和进度文件"""
+    worker_dir = os.path.join(work_dir, f"worker-{index}")
+    os.makedirs(worker_dir, exist_ok=True)
+    progress = os.path.join(worker_dir, "progress.jsonl")
+    command = [sys.executable, CLI, "--work", "--config", config_file, "--progress", progress,
+               "--batch-size", str(args.batch_size), "--lease", str(args.lease)]
+    process = subprocess.Popen(command, cwd=worker_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process, progress
+
+
+def read_events(progress_files):
+    events = []
+    for progress in progress_files:
+        if not os.path.exists(progress):
+            continue
+        with open(progress, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue  # 被强制结束的进程可能留下不完整的最后一行
+    return events
+
+
+def queue_counts(queue_file):
+    conn = sqlite3.connect(queue_file)
+    try:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+    finally:
+        conn.close()
+
+
+def run_queue(args, server, work_dir):
+    config_file = write_config(args, server, work_dir)
+    patents_file = os.path.join(work_dir, "patents.txt")
+    with open(patents_file, 'w', encoding='utf-8') as f:
+        f.write("\n".join(f"US{args.first + i}" for i in range(args.count)))
+    subprocess.run([sys.executable, CLI, patents_file, "--enqueue", "--config", config_file],
+                   cwd=work_dir, stdout=subprocess.DEVNULL, check=True)
+
+    start = time.perf_counter()
+    workers = [start_worker(args, config_file, work_dir, index) for index in range(args.processes)]
+    killed = 0
+    if args.kill_after:
+        # 强制结束第一个进程，它持有的任务要等租约过期后才能被其他进程领取
+        time.sleep(args.kill_after)
+        if workers[0][0].poll() is None:
+            workers[0][0].send_signal(getattr(signal, "SIGKILL", signal.SIGTERM))
+            killed = 1
+    for process, _ in workers:
+        process.wait()
+    elapsed = time.perf_counter() - start
+
+    events = read_events([progress for _, progress in workers])
+    successes = Counter(event["patent"] for event in events if event.get("event") == "success")
+    counts = queue_counts(os.path.join(work_dir, "downloads", "job_queue.db"))
+    return {
+        "patents": args.count,
+        "processes": args.processes,
+        "killed": killed,
+        "queue": counts,
+        "succeeded": len(successes),
+        "duplicate_downloads": sum(successes.values()) - len(successes),
+        "elapsed": round(elapsed, 3),
+        "patents_per_min": round(args.count * 60 / elapsed, 2) if elapsed else None,
+        "server": dict(server.counters),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="任务队列多进程基准（本地替身服务器）")
+    parser.add_argument("--count", type=int, default=100, help="专利数量")
+    parser.add_argument("--first", type=int, default=3000000, help="起始编号")
+    parser.add_argument("--processes", type=int, default=3, help="工作进程数")
+    parser.add_argument("--workers", type=int, default=2, help="每个进程的解析线程数")
+    parser.add_argument("--download-workers", type=int, default=2, help="每个进程的下载线程数")
+    parser.add_argument("--batch-size", type=int, default=10, help="每次领取的任务数")
+    parser.add_argument("--lease", type=int, default=10, help="任务租约时长（秒）")
+    parser.add_argument("--kill-after", type=float, default=0, help="启动后多少秒强制结束第一个工作进程，0表示不结束")
+    parser.add_argument("--delay", type=float, default=0.1, help="初始请求间隔（秒）")
+    parser.add_argument("--rate-max", type=float, default=200.0, help="每个主机的最大请求速率")
+    parser.add_argument("--output", help="把结果JSON追加写入该文件")
+    add_options_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = StandInServer(options_from_args(args)).start()
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            report = run_queue(args, server, work_dir)
+    finally:
+        server.stop()
+
+    line = json.dumps(report, ensure_ascii=False)
+    print(line)
+    if args.output:
+        with open(args.output, 'a', encoding='utf-8') as f:
+            f.write(line + "\n")
+    ok = report["queue"].get("pending", 0) == 0 and report["queue"].get("leased", 0) == 0
+    return 0 if ok and report["duplicate_downloads"] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# 重复专利号检查：专利号文件中同一专利以不同写法重复出现（US5001 / us 5001 / US5001），
+# 用 cli.py 逐行读取并发下载，检查每个专利只成功一次、没有失败，且文件读完后偏移到达末尾
+# 用法:
+#     python benchmarks/repeated_ids.py
+#     python benchmarks/repeated_ids.py --repeats 5 --workers 4 --latency 0.2
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from collections import Counter
+
+from stand_in_server import StandInServer, add_options_arguments, options_from_args
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "cli.py")
+
+SPELLINGS = ("US{n}", "us {n}", "US-{n}", "US{n}")
+
+
+def write_patents(path, args):
+    """每个专利号按不同写法连续重复多次，让重复行在第一次处理完之前就被读到"""
+    lines = []
+    for i in range(args.count):
+        n = args.first + i
+        lines.extend(SPELLINGS[k % len(SPELLINGS)].format(n=n) for k in range(args.repeats))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    return os.path.getsize(path)
+
+
+def run_check(args, server, work_dir):
+    config = dict(server.config_overrides())
+    config.update({
+        "download_dir": os.path.join(work_dir, "downloads"),
+        "http_resolver": True,
+        "browser_strategies": False,
+        "workers": args.workers,
+        "download_workers": args.download_workers,
+        "delay": 0.05,
+        "rate_max": 200.0,
+        "url_cache": False,
+    })
+    config_file = os.path.join(work_dir, "config.json")
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    patents_file = os.path.join(work_dir, "patents.txt")
+    file_size = write_patents(patents_file, args)
+
+    result = subprocess.run([sys.executable, CLI, patents_file, "--config", config_file],
+                            cwd=work_dir, capture_output=True, text=True)
+    events = [json.loads(line) for line in result.stdout.splitlines() if line.strip()]
+    successes = Counter(event["patent"] for event in events if event["event"] == "success")
+    failed = [event["patent"] for event in events if event["event"] == "failed"]
+    errors = [event["message"] for event in events
+              if event["event"] == "status" and ("错误" in event["message"] or "出错" in event["message"])]
+    sources = [event for event in events if event["event"] == "source"]
+    summary = next((event for event in events if event["event"] == "summary"), {})
+
+    expected = {f"US{args.first + i}" for i in range(args.count)}
+    problems = []
+    if set(successes) != expected:
+        problems.append(f"成功的专利不符: 缺少 {sorted(expected - set(successes))}")
+    problems.extend(f"重复下载: {patent} x{n}" for patent, n in successes.items() if n > 1)
+    problems.extend(f"下载失败: {patent}" for patent in failed)
+    problems.extend(f"错误信息: {message}" for message in errors)
+    if not sources or sources[-1]["offset"] != file_size or not sources[-1]["exhausted"]:
+        problems.append(f"偏移未到达文件末尾: {sources[-1] if sources else None}")
+    return {
+        "patents": args.count,
+        "lines": args.count * args.repeats,
+        "exit_code": result.returncode,
+        "succeeded": sum(successes.values()),
+        "failed": len(failed),
+        "duplicates": summary.get("duplicates"),
+        "problems": problems,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="重复专利号检查（本地替身服务器）")
+    parser.add_argument("--count", type=int, default=10, help="不同专利数量")
+    parser.add_argument("--repeats", type=int, default=4, help="每个专利号在文件中出现的次数")
+    parser.add_argument("--first", type=int, default=5001, help="起始编号")
+    parser.add_argument("--workers", type=int, default=4, help="解析线程数")
+    parser.add_argument("--download-workers", type=int, default=4, help="下载线程数")
+    add_options_arguments(parser)
+    parser.set_defaults(latency=0.1)  # 请求有延迟时重复行在第一次处理完之前就会被读到
+    args = parser.parse_args(argv)
+
+    server = StandInServer(options_from_args(args)).start()
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            report = run_check(args, server, work_dir)
+    finally:
+        server.stop()
+
+    print(json.dumps(report, ensure_ascii=False))
+    return 0 if report["exit_code"] == 0 and not report["problems"] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,267 @@
+# 本地Google Patents替身服务器：提供搜索页、专利详情页和PDF，可配置延迟、带宽、错误率和缺失专利
+# 用法:
+#     python benchmarks/stand_in_server.py --port 8765 --latency 0.05 --error-429 0.02
+#     然后把输出的 patent_page_url / search_url 写入配置即可让解析器和下载器指向本服务器
+import re
+import sys
+import json
+import time
+import zlib
+import argparse
+import threading
+from urllib.parse import unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+SEARCH_PATTERN = re.compile(r'^/\?q=\(?([^)&]+)\)?')
+PATENT_PATTERN = re.compile(r'^/patent/([^/?]+)(/en)?/?$')
+PDF_PATTERN = re.compile(r'^/pdf/([^/?]+)\.pdf$')
+
+SEARCH_PAGE = """<html><body><search-result-item>
+<a href="{pdf_url}"><span data-proto="OPEN_PATENT_PDF">PDF</span></a>
+</search-result-item></body></html>"""
+SEARCH_EMPTY_PAGE = "<html><body><p>No results found</p></body></html>"
+PATENT_PAGE = """<html><head><meta name="citation_pdf_url" content="{pdf_url}"></head>
+<body><a data-tip="Download PDF" href="{pdf_url}">Download PDF</a></body></html>"""
+NOT_FOUND_PAGE = "<html><body><h1>Error 404</h1><p>was not found on this server</p></body></html>"
+
+
+class StandInOptions:
+    """替身服务器的行为参数，同一seed下错误和缺失的分布可复现"""
+
+    def __init__(self, latency=0.0, bandwidth=0, pdf_size=200 * 1024, missing_rate=0.0,
+                 error_429=0.0, error_5xx=0.0, truncated=0.0, family_size=1, seed=1):
+        self.latency = latency  # 每个请求的额外延迟（秒）
+        self.bandwidth = bandwidth  # PDF传输带宽（字节/秒），0表示不限
+        self.pdf_size = pdf_size
+        self.missing_rate = missing_rate
+        self.error_429 = error_429
+        self.error_5xx = error_5xx
+        self.truncated = truncated  # 声明完整长度但中途断开的比例
+        self.family_size = family_size  # 每多少个连续编号的专利共用同一份PDF
+        self.seed = seed
+
+
+def chance(seed, key, rate):
+    """按 (seed, key) 决定是否命中给定比例，结果可复现"""
+    if rate <= 0:
+        return False
+    return zlib.crc32(f"{seed}:{key}".encode()) % 10000 < rate * 10000
+
+
+def family_key(patent, family_size):
+    """同族专利映射到同一份PDF：按编号数字分组"""
+    digits = re.sub(r'\D', '', patent)
+    if family_size <= 1 or not digits:
+        return patent
+    return f"F{int(digits) // family_size}"
+
+
+def pdf_bytes(key, size):
+    header = f"%PDF-1.4\n% {key}\n".encode()
+    trailer = b"\n%%EOF\n"
+    filler = max(0, size - len(header) - len(trailer))
+    return header + (b"0" * filler) + trailer
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def options(self):
+        return self.server.options
+
+    def attempt(self, key):
+        """同一地址第几次被请求，错误只在特定的尝试上出现，重试可以成功"""
+        with self.server.lock:
+            count = self.server.attempts.get(key, 0) + 1
+            self.server.attempts[key] = count
+        return count
+
+    def send_body(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        options = self.options
+        if options.latency:
+            time.sleep(options.latency)
+        path = unquote(self.path)
+        attempt = self.attempt(path)
+        key = f"{path}#{attempt}"
+        self.server.count("requests")
+
+        # 限流和服务器错误
+        if chance(options.seed, f"429:{key}", options.error_429):
+            self.server.count("429")
+            return self.send_body(429, b"Too Many Requests", headers={"Retry-After": "1"})
+        if chance(options.seed, f"5xx:{key}", options.error_5xx):
+            self.server.count("5xx")
+            return self.send_body(503, b"Service Unavailable")
+
+        match = SEARCH_PATTERN.match(path)
+        if match:
+            patent = match.group(1).strip()
+            if self.is_missing(patent):
+                return self.send_body(200, SEARCH_EMPTY_PAGE.encode())
+            return self.send_body(200, SEARCH_PAGE.format(pdf_url=self.pdf_url(patent)).encode())
+
+        match = PATENT_PATTERN.match(path)
+        if match:
+            patent = match.group(1)
+            if self.is_missing(patent):
+                return self.send_body(404, NOT_FOUND_PAGE.encode())
+            return self.send_body(200, PATENT_PAGE.format(pdf_url=self.pdf_url(patent)).encode())
+
+        match = PDF_PATTERN.match(path)
+        if match:
+            return self.send_pdf(match.group(1), key)
+
+        self.send_body(404, NOT_FOUND_PAGE.encode())
+
+    def is_missing(self, patent):
+        return patent.upper().startswith("MISS") or chance(self.options.seed, f"missing:{patent}", self.options.missing_rate)
+
+    def pdf_url(self, patent):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/pdf/{family_key(patent, self.options.family_size)}.pdf"
+
+    def send_pdf(self, key, request_key):
+        data = pdf_bytes(key, self.options.pdf_size)
+        start, end = 0, len(data) - 1
+        status = 200
+        headers = {"Accept-Ranges": "bytes"}
+        requested = self.headers.get("Range")
+        if requested:
+            match = re.match(r'bytes=(\d+)-(\d*)', requested)
+            if match:
+                start = int(match.group(1))
+                end = min(int(match.group(2)), len(data) - 1) if match.group(2) else len(data) - 1
+                if start >= len(data):
+                    return self.send_body(416, b"", headers={"Content-Range": f"bytes */{len(data)}"})
+                status = 206
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+        body = data[start:end + 1]
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+
+        # 截断：只发送一半后断开连接
+        if chance(self.options.seed, f"truncated:{request_key}", self.options.truncated):
+            self.server.count("truncated")
+            body = body[:len(body) // 2]
+            self.close_connection = True
+        self.write_throttled(body)
+        self.server.count("pdf_bytes", len(body))
+
+    def write_throttled(self, body, block=16 * 1024):
+        bandwidth = self.options.bandwidth
+        for offset in range(0, len(body), block):
+            chunk = body[offset:offset + block]
+            self.wfile.write(chunk)
+            if bandwidth:
+                time.sleep(len(chunk) / bandwidth)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """在后台线程运行的替身服务器"""
+    daemon_threads = True
+
+    def __init__(self, options=None, host="127.0.0.1", port=0):
+        super().__init__((host, port), StandInHandler)
+        self.options = options or StandInOptions()
+        self.lock = threading.Lock()
+        self.attempts = {}
+        self.counters = {}
+        self._thread = None
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def handle_error(self, request, client_address):
+        # 客户端提前关闭连接（分段下载只读第一次请求的一段、被停止、进程被结束）属于正常情况，只计数
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            self.count("client_closed")
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def config_overrides(self):
+        """让解析器和下载器指向本服务器的配置项"""
+        return {
+            "patent_page_url": f"{self.base_url}/patent/{{patent}}/en",
+            "search_url": f"{self.base_url}/?q=({{patent}})",
+            "proxy": "",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="StandInServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def add_options_arguments(parser):
+    parser.add_argument("--latency", type=float, default=0.0, help="每个请求的额外延迟（秒）")
+    parser.add_argument("--bandwidth", type=float, default=0, help="PDF传输带宽（KB/s），0表示不限")
+    parser.add_argument("--pdf-kb", type=int, default=200, help="每个PDF的大小（KB）")
+    parser.add_argument("--missing-rate", type=float, default=0.0, help="不存在的专利比例")
+    parser.add_argument("--error-429", type=float, default=0.0, help="返回429的请求比例")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="返回503的请求比例")
+    parser.add_argument("--truncated", type=float, default=0.0, help="PDF中途断开的比例")
+    parser.add_argument("--family-size", type=int, default=1, help="每多少个连续编号共用同一份PDF")
+    parser.add_argument("--seed", type=int, default=1, help="随机种子，相同种子的错误分布相同")
+
+
+def options_from_args(args):
+    return StandInOptions(latency=args.latency, bandwidth=int(args.bandwidth * 1024),
+                          pdf_size=args.pdf_kb * 1024, missing_rate=args.missing_rate,
+                          error_429=args.error_429, error_5xx=args.error_5xx,
+                          truncated=args.truncated, family_size=args.family_size, seed=args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地Google Patents替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_options_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server = StandInServer(options_from_args(args), args.host, args.port)
+    print(json.dumps(server.config_overrides(), ensure_ascii=False, indent=4))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
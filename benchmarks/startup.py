@@ -0,0 +1,80 @@
+# 启动耗时基准：测量主界面模块的导入耗时和首个窗口出现的耗时
+# 用法:
+#     python benchmarks/startup.py                 # 输出JSON结果
+#     python benchmarks/startup.py --budget 1.5    # 首窗耗时超过1.5秒时返回非零退出码
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 启动阶段不应加载的重依赖，出现即视为回归
+HEAVY_MODULES = ["selenium", "webdriver_manager", "requests", "engine", "downloader"]
+
+# 在全新子进程中执行，避免当前进程已缓存的模块影响结果
+PROBE = r"""
+import sys, time, json
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
+import main
+import_time = time.perf_counter() - start
+
+app = QApplication(sys.argv)
+window = main.PatentBrowser()
+window.show()
+result = {}
+
+def first_frame():
+    result["first_window"] = time.perf_counter() - start
+    app.quit()
+
+QTimer.singleShot(0, first_frame)
+app.exec_()
+result["import"] = import_time
+result["heavy_loaded"] = [name for name in HEAVY if name in sys.modules]
+print(json.dumps(result))
+"""
+
+
+def run_probe():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    if not env.get("DISPLAY") and sys.platform.startswith("linux"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    # 在临时目录运行，避免读写仓库中的config.json和下载目录
+    with tempfile.TemporaryDirectory() as work_dir:
+        code = f"HEAVY = {HEAVY_MODULES!r}\n{PROBE}"
+        output = subprocess.run([sys.executable, "-c", code], cwd=work_dir, env=env,
+                                capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量启动耗时")
+    parser.add_argument("--runs", type=int, default=5, help="重复次数，取中位数")
+    parser.add_argument("--budget", type=float, help="首窗耗时上限（秒），超出返回1")
+    args = parser.parse_args(argv)
+
+    samples = [run_probe() for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "import_median": statistics.median(s["import"] for s in samples),
+        "first_window_median": statistics.median(s["first_window"] for s in samples),
+        "heavy_loaded": sorted({name for s in samples for name in s["heavy_loaded"]}),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=4))
+
+    if report["heavy_loaded"]:
+        return 1
+    if args.budget is not None and report["first_window_median"] > args.budget:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
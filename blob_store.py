@@ -0,0 +1,153 @@
+import os
+import sys
+import time
+import shutil
+import logging
+
+BLOB_DIR = ".blobs"
+FICLONE = 0x40049409  # Linux ioctl，在btrfs/xfs等文件系统上共享数据块
+
+
+def reflink(src, dst):
+    """尝试写时复制克隆，不支持时抛出OSError"""
+    if not sys.platform.startswith("linux"):
+        raise OSError("reflink不可用")
+    import fcntl
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+
+
+def link(src, dst):
+    """依次尝试硬链接、reflink，返回使用的方式；文件系统都不支持时（如exFAT/FAT）返回None"""
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        pass
+    try:
+        reflink(src, dst)
+        return "reflink"
+    except OSError:
+        return None
+
+
+def link_or_copy(src, dst):
+    """依次尝试硬链接、reflink、普通复制，返回使用的方式"""
+    method = link(src, dst)
+    if method:
+        return method
+    shutil.copyfile(src, dst)
+    return "copy"
+
+
+class BlobStore:
+    """内容寻址的PDF存储：同一内容只保存一份，以SHA-256命名放在下载目录的.blobs中，
+    各专利的PDF文件是指向它的硬链接；索引表与下载历史在同一数据库，写入随下载历史批量提交
+
+    文件系统不支持硬链接和reflink时不保存内容副本，专利文件本身就是唯一副本
+    """
+
+    def __init__(self, download_dir, history):
+        self.blob_dir = os.path.join(download_dir, BLOB_DIR)
+        self.history = history
+        self.conn = history.conn
+        self._lock = history._lock
+        self.logger = logging.getLogger("BlobStore")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        with self._lock:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    sha256 TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    time TEXT
+                )
+            """)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS blob_urls (url TEXT PRIMARY KEY, sha256 TEXT NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS blob_refs (patent TEXT PRIMARY KEY, sha256 TEXT NOT NULL)")
+            self.conn.commit()
+
+    def blob_path(self, sha256):
+        return os.path.join(self.blob_dir, sha256[:2], f"{sha256}.pdf")
+
+    def lookup_url(self, url):
+        """按PDF链接查找已保存的内容，返回SHA-256；内容文件缺失或大小不符时返回None"""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT b.sha256, b.size FROM blob_urls u JOIN blobs b ON b.sha256 = u.sha256 WHERE u.url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        sha256, size = row
+        try:
+            if os.path.getsize(self.blob_path(sha256)) != size:
+                return None
+        except OSError:
+            return None
+        return sha256
+
+    def blob_of(self, patent):
+        with self._lock:
+            row = self.conn.execute("SELECT sha256 FROM blob_refs WHERE patent = ?", (patent,)).fetchone()
+        return row[0] if row else None
+
+    def place(self, src, dst, copy=True):
+        """让dst成为src内容的链接（copy为真时不行就复制），通过临时名替换保证dst始终完整；
+        不能链接又不允许复制时返回None"""
+        if os.path.exists(dst) and os.path.samefile(src, dst):
+            return "same"
+        temp = f"{dst}.link"
+        if os.path.exists(temp):
+            os.remove(temp)
+        method = link_or_copy(src, temp) if copy else link(src, temp)
+        if method is None:
+            return None
+        os.replace(temp, dst)
+        return method
+
+    def link_from_url(self, url, file_path, patent):
+        """链接已有相同URL的内容到file_path，无需网络传输；成功返回SHA-256，否则返回None"""
+        sha256 = self.lookup_url(url)
+        if sha256 is None:
+            return None
+        method = self.place(self.blob_path(sha256), file_path)
+        self._record(patent, sha256, os.path.getsize(file_path), url)
+        self.logger.info(f"{patent} 与已下载内容相同({method}): {sha256}")
+        return sha256
+
+    def add(self, patent, file_path, sha256, url=None):
+        """登记新下载的文件；内容已存在时把file_path换成指向已有内容的链接，返回是否去重"""
+        blob = self.blob_path(sha256)
+        deduped = False
+        if os.path.exists(blob):
+            deduped = self.place(blob, file_path) != "same"
+        else:
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            if self.place(file_path, blob, copy=False) is None:
+                # 复制进.blobs只会让每份内容占两份空间，也无法为之后的相同内容去重
+                return False
+        self._record(patent, sha256, os.path.getsize(file_path), url)
+        if deduped:
+            self.logger.info(f"{patent} 内容与已有文件相同，已改为链接: {sha256}")
+        return deduped
+
+    def _record(self, patent, sha256, size, url):
+        with self._lock:
+            self.conn.execute("INSERT OR IGNORE INTO blobs (sha256, size, time) VALUES (?, ?, ?)",
+                              (sha256, size, time.strftime("%Y-%m-%d %H:%M:%S")))
+            if url:
+                self.conn.execute("INSERT OR REPLACE INTO blob_urls (url, sha256) VALUES (?, ?)", (url, sha256))
+            self.conn.execute("INSERT OR REPLACE INTO blob_refs (patent, sha256) VALUES (?, ?)", (patent, sha256))
+            self.history._written()
+
+    def stats(self):
+        """(专利数, 不同内容数)"""
+        with self._lock:
+            refs = self.conn.execute("SELECT COUNT(*) FROM blob_refs").fetchone()[0]
+            blobs = self.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+        return refs, blobs
@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import logging
+import threading
+from types import SimpleNamespace
+
+DRIVER_CACHE_FILE = "chromedriver_cache.json"
+
+logger = logging.getLogger("BrowserSession")
+
+_selenium = None
+
+def selenium_modules():
+    """首次需要浏览器时才导入selenium和webdriver_manager，HTTP解析全部命中时完全不加载"""
+    global _selenium
+    if _selenium is None:
+        from selenium import webdriver
+        from selenium.webdriver.chrome.service import Service
+        from selenium.webdriver.chrome.options import Options
+        from webdriver_manager.chrome import ChromeDriverManager
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException
+        _selenium = SimpleNamespace(webdriver=webdriver, Service=Service, Options=Options,
+                                    ChromeDriverManager=ChromeDriverManager, By=By,
+                                    WebDriverWait=WebDriverWait, EC=EC,
+                                    TimeoutException=TimeoutException)
+    return _selenium
+
+
+def application_path():
+    """应用程序运行路径，打包后为可执行文件所在目录"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+def find_local_chromedriver():
+    """查找随程序分发的绿色版ChromeDriver"""
+    names = ("chromedriver.exe", "chromedriver")
+    base = application_path()
+
+    # 首先检查chromedriver目录
+    chrome_dir = os.path.join(base, "chromedriver")
+    if os.path.exists(chrome_dir):
+        for root, dirs, files in os.walk(chrome_dir):
+            for file in files:
+                if file.lower() in names:
+                    return os.path.join(root, file)
+
+    # 如果没找到，检查应用程序根目录
+    for name in names:
+        if os.path.isfile(os.path.join(base, name)):
+            return os.path.join(base, name)
+    return None
+
+
+class DriverResolver:
+    """ChromeDriver路径解析，结果缓存到文件，离线时直接使用缓存"""
+
+    def __init__(self, cache_file=None):
+        self.cache_file = cache_file or os.path.join(application_path(), DRIVER_CACHE_FILE)
+        self._lock = threading.Lock()
+        self._path = None
+
+    def load_cache(self):
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get("path")
+        except Exception as e:
+            logger.warning(f"读取ChromeDriver缓存失败: {str(e)}")
+        return None
+
+    def save_cache(self, path, source):
+        try:
+            with open(self.cache_file, 'w', encoding='utf-8') as f:
+                json.dump({"path": path, "source": source,
+                           "resolved": time.strftime("%Y-%m-%d %H:%M:%S")},
+                          f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            logger.warning(f"保存ChromeDriver缓存失败: {str(e)}")
+
+    def resolve(self, config, refresh=False):
+        """依次尝试：配置指定、缓存、本地绿色版、系统PATH、webdriver_manager下载"""
+        with self._lock:
+            if self._path and not refresh:
+                return self._path
+
+            path, source = config.get("chromedriver_path"), "config"
+            if not (path and os.path.isfile(path)) and not refresh:
+                path, source = self.load_cache(), "cache"
+            if not (path and os.path.isfile(path)):
+                path, source = find_local_chromedriver(), "local"
+            if not path:
+                path, source = shutil.which("chromedriver"), "path"
+            if not path:
+                # 只有以上都找不到时才联网检查版本并下载
+                path, source = selenium_modules().ChromeDriverManager().install(), "webdriver_manager"
+
+            if source != "cache":
+                self.save_cache(path, source)
+            logger.info(f"使用ChromeDriver({source}): {path}")
+            self._path = path
+            return path
+
+    def invalidate(self):
+        with self._lock:
+            self._path = None
+            try:
+                if os.path.exists(self.cache_file):
+                    os.remove(self.cache_file)
+            except OSError:
+                pass
+
+
+def options_key(options):
+    """浏览器启动选项的标识，只有选项相同的浏览器才能复用"""
+    return json.dumps(options.to_capabilities(), sort_keys=True, default=str)
+
+
+# 精简浏览模式拦截的资源：图片、字体、媒体和第三方统计/广告主机
+LEAN_BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.ico", "*.svg",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.ogg",
+    "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*gstatic.com/images*", "*youtube.com*",
+]
+
+LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+    "profile.managed_default_content_settings.plugins": 2,
+}
+
+
+def apply_lean_options(options):
+    """精简浏览模式的启动选项：eager加载策略，禁止图片和媒体"""
+    options.page_load_strategy = 'eager'
+    options.add_experimental_option("prefs", LEAN_PREFS)
+    options.add_argument('--blink-settings=imagesEnabled=false')
+
+
+def apply_lean_blocking(driver):
+    """通过DevTools拦截图片、字体、媒体和第三方主机的请求"""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": LEAN_BLOCKED_URLS})
+
+
+def enable_traffic_log(options):
+    """开启性能日志，用于统计每个页面的流量和被拦截的请求"""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def page_traffic(driver):
+    """读取并清空性能日志，返回 (已传输字节数, 被拦截请求数)"""
+    transferred = 0
+    blocked = 0
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.loadingFinished":
+            transferred += int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed" and (
+                params.get("blockedReason") or "BLOCKED_BY_CLIENT" in params.get("errorText", "")):
+            blocked += 1
+    return transferred, blocked
+
+
+class BrowserSessionManager:
+    """在同一应用会话内保留空闲的热浏览器，跨多次检索复用，复用前做健康检查"""
+
+    def __init__(self, max_idle=16):
+        self.max_idle = max_idle
+        self.resolver = DriverResolver()
+        self._idle = []  # [(选项标识, driver)]
+        self._lock = threading.Lock()
+
+    def launch(self, options, config):
+        """用解析到的ChromeDriver启动新浏览器，缓存路径失效时重新解析一次"""
+        se = selenium_modules()
+        path = self.resolver.resolve(config)
+        try:
+            return se.webdriver.Chrome(service=se.Service(path), options=options)
+        except Exception as e:
+            logger.warning(f"ChromeDriver启动失败，重新解析驱动: {str(e)}")
+            self.resolver.invalidate()
+            path = self.resolver.resolve(config, refresh=True)
+            return se.webdriver.Chrome(service=se.Service(path), options=options)
+
+    @staticmethod
+    def is_healthy(driver):
+        try:
+            return driver.execute_script("return 1;") == 1 and bool(driver.window_handles)
+        except Exception:
+            return False
+
+    def acquire(self, options, config):
+        """优先取一个选项相同且健康的空闲浏览器，没有则新启动，返回 (driver, 是否复用)"""
+        key = options_key(options)
+        while True:
+            with self._lock:
+                index = next((i for i, (k, _) in enumerate(self._idle) if k == key), None)
+                if index is None:
+                    break
+                _, driver = self._idle.pop(index)
+            if self.is_healthy(driver):
+                return driver, True
+            self.quit(driver)
+        return self.launch(options, config), False
+
+    def release(self, driver, options):
+        """归还浏览器，空闲数量未满时保持热状态，否则关闭"""
+        if not self.is_healthy(driver):
+            self.quit(driver)
+            return
+        try:
+            driver.get("about:blank")
+        except Exception:
+            self.quit(driver)
+            return
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append((options_key(options), driver))
+                return
+        self.quit(driver)
+
+    @staticmethod
+    def quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def shutdown(self):
+        """关闭所有空闲浏览器"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, driver in idle:
+            self.quit(driver)
+
+
+browser_sessions = BrowserSessionManager()
+atexit.register(browser_sessions.shutdown)
@@ -0,0 +1,208 @@
+# 命令行批量下载入口，不依赖PyQt，适合服务器和定时任务
+# 用法:
+#     python cli.py patents.txt
+#     cat patents.txt | python cli.py - --workers 4 --progress progress.jsonl
+#     python cli.py export.csv.gz --column id    # 大文件逐行读取，中断后用 --offset 从source事件记录的偏移继续
+# 多进程/多主机分布式下载（共享下载目录中的任务队列）:
+#     python cli.py patents.txt --enqueue        # 只加入任务队列
+#     python cli.py --work                       # 领取任务下载，可在多台机器上同时运行
+import os
+import sys
+import json
+import time
+import argparse
+from config import Config
+from engine import PatentEngine, EVENT_FIELDS
+from patent_ids import PatentIndex
+from patent_source import PatentFileSource
+from history_store import DownloadHistory
+from job_queue import JobQueue, QueueSource, JOB_QUEUE_DB
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+EXIT_INTERRUPTED = 130
+
+
+def read_patents(source, column=None, offset=0):
+    """标准输入读成列表；文件返回逐行惰性读取的来源，支持TXT、CSV和gzip"""
+    if source == "-":
+        return [line.strip() for line in sys.stdin if line.strip()]
+    return PatentFileSource(source, column, offset)
+
+
+def iter_batches(patents, size=10000):
+    """分批取出专利号，入队时不必把整个文件读入内存"""
+    ids = patents.ids() if isinstance(patents, PatentFileSource) else iter(patents)
+    batch = []
+    for patent in ids:
+        batch.append(patent)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class JsonlReporter:
+    """把引擎事件逐行写成JSON"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.index = None  # 规范号 -> 原始输入行，用于在报告中还原输入
+        self.succeeded = set()
+        self.failed = set()
+
+    def __call__(self, event, *args):
+        if event == "success":
+            self.succeeded.add(args[0])
+            self.failed.discard(args[0])
+        elif event == "failed":
+            self.failed.add(args[0])
+        record = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "event": event}
+        record.update(zip(EVENT_FIELDS.get(event, ()), args))
+        if self.index is not None and "patent" in record:
+            originals = self.index.originals(record["patent"])
+            if originals and originals != [record["patent"]]:
+                record["inputs"] = originals
+        self.write(record)
+
+    def summary(self):
+        self.write({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "event": "summary",
+                    "succeeded": len(self.succeeded), "failed": len(self.failed),
+                    "duplicates": self.index.duplicates if self.index is not None else 0})
+
+    def write(self, record):
+        self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="专利PDF批量下载（命令行）")
+    parser.add_argument("source", nargs="?", help="专利号文件（TXT每行一个，或CSV、gzip压缩文件）；使用 - 从标准输入读取")
+    parser.add_argument("--column", help="CSV文件中专利号所在的列名或列号（从0开始），默认第一列")
+    parser.add_argument("--offset", type=int, default=0, help="从文件的该字节偏移处继续读取，取自上次进度中的source事件")
+    parser.add_argument("--config", default="config.json", help="配置文件路径")
+    parser.add_argument("--download-dir", help="覆盖配置中的下载目录")
+    parser.add_argument("--proxy", help="覆盖配置中的代理地址，多个用逗号分隔组成代理池，传空字符串表示不使用代理")
+    parser.add_argument("--workers", type=int, help="并发浏览器数")
+    parser.add_argument("--download-workers", type=int, help="并发下载数")
+    parser.add_argument("--progress", help="进度JSONL输出文件，默认输出到标准输出")
+    parser.add_argument("--enqueue", action="store_true", help="把专利号加入共享任务队列后退出")
+    parser.add_argument("--work", action="store_true", help="作为工作进程从共享任务队列领取任务")
+    parser.add_argument("--queue", help=f"任务队列数据库，默认为下载目录中的 {JOB_QUEUE_DB}")
+    parser.add_argument("--batch-size", type=int, default=20, help="工作进程每次领取的任务数")
+    parser.add_argument("--lease", type=int, default=300, help="任务租约时长（秒），到期未续租的任务可被其他进程领取")
+    args = parser.parse_args(argv)
+    if not args.source and not args.work:
+        parser.error("需要指定专利号文件，或使用 --work 处理任务队列")
+    return args
+
+
+def run_worker(config, job_queue, reporter, batch_size, poll_interval=5):
+    """用一个引擎持续领取任务并下载，队列中没有待处理和租用中的任务时退出；返回是否被中断"""
+    source = QueueSource(job_queue, batch_size, poll_interval)
+
+    def listener(event, *args):
+        reporter(event, *args)
+        if event in ("success", "failed"):
+            source.record(args[0], event)
+
+    engine = PatentEngine(source, config, listener)
+    reporter.index = engine.index
+    interrupted = False
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        engine.stop()
+        interrupted = True
+    finally:
+        # 引擎出错时仍持有的任务计为失败（未达最大尝试次数时放回队列），被停止时归还队列
+        source.close(engine.error)
+    return interrupted or not engine.is_running
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    config = Config(args.config)
+
+    # 命令行参数只覆盖本次运行，不写回配置文件
+    overrides = {
+        "download_dir": args.download_dir,
+        "proxy": args.proxy,
+        "workers": args.workers,
+        "download_workers": args.download_workers,
+    }
+    for key, value in overrides.items():
+        if value is not None:
+            config.config[key] = value
+    os.makedirs(config.get("download_dir"), exist_ok=True)
+
+    patents = []
+    if args.source:
+        try:
+            patents = read_patents(args.source, args.column, args.offset)
+        except (OSError, ValueError) as e:
+            sys.stderr.write(f"读取专利号失败: {str(e)}\n")
+            return EXIT_ERROR
+
+    if args.enqueue or args.work:
+        return run_queue(args, config, patents)
+
+    stream = open(args.progress, 'a', encoding='utf-8') if args.progress else sys.stdout
+    reporter = JsonlReporter(stream)
+    engine = PatentEngine(patents, config, reporter)
+    reporter.index = engine.index
+    try:
+        engine.run()
+    except KeyboardInterrupt:
+        engine.stop()
+        return EXIT_INTERRUPTED
+    finally:
+        reporter.summary()
+        if args.progress:
+            stream.close()
+
+    if engine.error is not None:
+        return EXIT_ERROR
+    return EXIT_FAILED if reporter.failed else EXIT_OK
+
+
+def run_queue(args, config, patents):
+    """任务队列模式：加入任务，和/或作为工作进程处理队列"""
+    queue_path = args.queue or os.path.join(config.get("download_dir"), JOB_QUEUE_DB)
+    # 下载目录可能被多台主机共用（网络文件系统不支持WAL的共享内存），下载历史同样改用回滚日志
+    config.config["history_journal_mode"] = "DELETE"
+    # 多个进程共用下载历史，每条记录立即提交，未提交的批量写入会一直占着写锁让其他进程超时
+    config.config["history_batch_size"] = 1
+    job_queue = JobQueue(queue_path, lease_seconds=args.lease, max_attempts=config.get("retry_count", 3))
+    stream = open(args.progress, 'a', encoding='utf-8') if args.progress else sys.stdout
+    reporter = JsonlReporter(stream)
+    try:
+        if patents:
+            # 与下载历史共用同一判断，已成功下载的专利不再入队
+            history = DownloadHistory(config.get("download_dir"), journal_mode=config.get("history_journal_mode"))
+            try:
+                added = sum(job_queue.enqueue(PatentIndex(batch).patents, history)
+                            for batch in iter_batches(patents))
+            finally:
+                history.close()
+            reporter.write({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "event": "enqueued",
+                            "added": added, "queue": job_queue.counts()})
+        if not args.work:
+            return EXIT_OK
+        if run_worker(config, job_queue, reporter, args.batch_size):
+            return EXIT_INTERRUPTED
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+    finally:
+        if args.work:
+            reporter.summary()
+        job_queue.close()
+        if args.progress:
+            stream.close()
+    return EXIT_FAILED if reporter.failed else EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
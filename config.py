@@ -8,11 +8,36 @@ class Config:
     DEFAULT_CONFIG = {
         "download_dir": "",
         "proxy": "127.0.0.1:7890",
+        "proxy_max_connections": 16,
+        "proxy_eject_failures": 3,
+        "proxy_eject_seconds": 300,
         "delay": 5,
         "timeout": 30,
         "retry_count": 3,
         "chunk_size": 8192,
-        "log_level": "INFO"
+        "log_level": "INFO",
+        "workers": 1,
+        "chromedriver_path": "",
+        "keep_browser_warm": True,
+        "lean_browsing": True,
+        "element_wait_timeout": 10,
+        "download_workers": 4,
+        "download_queue_size": 8,
+        "max_connections_per_host": 4,
+        "segment_threshold_mb": 16,
+        "segment_size_mb": 8,
+        "segment_connections": 4,
+        "dedupe_downloads": True,
+        "history_journal_mode": "WAL",
+        "metrics_file": "metrics.json",
+        "http_resolver": True,
+        "url_cache": True,
+        "url_cache_ttl_hours": 168,
+        "log_view_lines": 5000,
+        "stream_import_mb": 5,
+        "patent_page_url": "https://patents.google.com/patent/{patent}/en",
+        "search_url": "https://patents.google.com/?q=({patent})",
+        "browser_strategies": True
     }
     
     def __init__(self, config_file="config.json"):
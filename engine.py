@@ -0,0 +1,876 @@
+import os
+import time
+import queue
+import threading
+import json
+import logging
+from http_resolver import HttpResolver
+from pdf_fetcher import PdfFetcher, verify_pdf_file
+from rate_limiter import RateControl, RateLimited, looks_like_bot_check
+from strategy_stats import StrategyStats
+from history_store import DownloadHistory, FileManifest
+from blob_store import BlobStore
+from metrics import Metrics
+from proxy_pool import ProxyPool
+from page_waits import wait_for_any, EMPTY
+from patent_ids import PatentIndex, normalize_patent_id
+from patent_source import PatentSource, OffsetTracker
+from browser_session import (browser_sessions, selenium_modules, apply_lean_options,
+                             apply_lean_blocking, enable_traffic_log, page_traffic, application_path)
+from url_cache import UrlCache
+
+# 策略1-4的选择器合并为一次脚本调用，返回各策略找到的PDF链接
+SEARCH_CANDIDATES_SCRIPT = """
+var result = {};
+var link = document.querySelector("search-result-item a[href*='patentimages.storage.googleapis.com']");
+result["1"] = link ? link.href : null;
+var match = document.documentElement.outerHTML.match(/href="(https:\\/\\/patentimages\\.storage\\.googleapis\\.com\\/[^"]+\\.pdf)"/);
+result["2"] = match ? match[1] : null;
+var span = document.querySelector("span[data-proto='OPEN_PATENT_PDF']");
+result["3"] = span && span.parentElement ? (span.parentElement.href || null) : null;
+var node = document.evaluate("//span[@data-proto='OPEN_PATENT_PDF']/..", document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+result["4"] = node ? (node.href || null) : null;
+return result;
+"""
+
+# 搜索页和专利页上代表“已出现PDF链接”和“确定没有结果”的标记
+DEFAULT_SEARCH_URL = "https://patents.google.com/?q=({patent})"
+SEARCH_LINK_SELECTORS = [
+    "search-result-item a[href*='patentimages.storage.googleapis.com']",
+    "span[data-proto='OPEN_PATENT_PDF']",
+]
+SEARCH_EMPTY_TEXTS = ["No results found", "did not match any documents"]
+PATENT_LINK_SELECTORS = [
+    "a[data-tip='Download PDF']",
+    "a[href*='patentimages.storage.googleapis.com'][href$='.pdf']",
+]
+PATENT_EMPTY_TEXTS = ["Error 404", "was not found on this server"]
+
+# 引擎对外事件及其参数，界面和命令行通过回调接收
+EVENT_FIELDS = {
+    "status": ("message",),
+    "failed": ("patent",),
+    "progress": ("progress",),
+    "log": ("patent", "filename", "strategy"),
+    "success": ("patent",),
+    "rate": ("rate",),
+    "metrics": ("throughput",),
+    "source": ("offset", "exhausted"),
+}
+
+class PatentEngine:
+    """专利检索下载引擎，不依赖Qt，通过 listener(事件名, *参数) 回调报告进度"""
+    
+    def __init__(self, patents, config, listener=None):
+        # 规范化并去重，文件名和历史记录都使用规范号
+        # 专利号文件、任务队列等作为来源时边读边处理，不在内存中保存完整列表
+        self.source = patents if isinstance(patents, PatentSource) else None
+        self.source_tracker = None
+        self._source_emitted = 0.0
+        self._in_flight = set()  # 来源中已放入任务队列、尚未处理完的规范号
+        if self.source is not None:
+            self.index = PatentIndex()
+            if self.source.offset is not None:
+                self.source_tracker = OffsetTracker(self.source.offset)
+        else:
+            self.index = patents if isinstance(patents, PatentIndex) else PatentIndex(patents)
+        self.patents = self.index.patents
+        self.config = config
+        self.listener = listener
+        self.is_running = True
+        self.error = None
+        
+        # 每个工作线程独占一个浏览器，线程本地保存driver和搜索页缓存
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+        self.driver = None
+        self._search_page = None  # (专利号, 候选链接)，同一专利的策略1-4共用一次页面加载，加载失败时候选链接为None
+        self.total_patents = len(self.patents)
+        self.processed_patents = 0
+        self.page_stats = {"pages": 0, "bytes": 0, "blocked": 0, "time": 0.0}
+        self.worker_count = max(1, int(config.get("workers", 1)))
+        self.download_worker_count = max(1, int(config.get("download_workers", 4)))
+        self.download_history = DownloadHistory(config.get("download_dir"), config.get("history_batch_size", 50),
+                                                journal_mode=config.get("history_journal_mode", "WAL"))
+        
+        # 运行指标：各阶段耗时、吞吐量和剩余时间，定期写出快照文件
+        download_dir = config.get("download_dir")
+        self.metrics = Metrics(
+            os.path.join(download_dir, config.get("metrics_file", "metrics.json")),
+            total=self.total_patents,
+            interval=config.get("metrics_interval", 2.0),
+            patent_log=os.path.join(download_dir, "patent_metrics.jsonl") if config.get("metrics_patent_log", True) else None,
+        )
+        
+        # 所有解析器和下载器共用的自适应限速，取代固定延时
+        self.rate_control = RateControl(config, on_change=lambda summary: self.emit("rate", summary),
+                                        metrics=self.metrics)
+        
+        # 配置了多个代理时组成代理池，按并发、延迟和失败情况分配；未配置代理时为None
+        self.proxy_pool = ProxyPool.from_config(config)
+        
+        # 无浏览器解析器，优先于Selenium策略
+        self.http_resolver = None
+        if config.get("http_resolver", True):
+            self.http_resolver = HttpResolver(config, self.rate_control, self.proxy_pool)
+        
+        # 已校验文件清单，跳过已下载文件前以此确认文件完整
+        self.manifest = FileManifest(self.download_history)
+        
+        # 按内容去重：同族专利解析到同一PDF时只下载、保存一份
+        self.blob_store = None
+        if config.get("dedupe_downloads", True):
+            self.blob_store = BlobStore(config.get("download_dir"), self.download_history)
+        
+        # 共享连接池的下载引擎
+        self.fetcher = PdfFetcher(config, self.rate_control, self.manifest, self.proxy_pool)
+        
+        # 持久化的链接缓存，命中时无需再解析；相对路径放在应用程序目录，
+        # 与启动时的工作目录无关，更换下载目录后仍能命中
+        self.url_cache = None
+        if config.get("url_cache", True):
+            cache_file = os.path.join(application_path(), config.get("url_cache_file", "url_cache.db"))
+            self.url_cache = UrlCache(cache_file,
+                                      config.get("url_cache_ttl_hours", 168),
+                                      config.get("url_cache_max_entries", 200000))
+        
+        # 各专利类型的策略成功统计，用于调整策略顺序
+        self.strategy_stats = StrategyStats(config.get("download_dir"))
+        
+        # 配置日志 - 将日志级别转换为英文
+        log_level_map = {
+            "调试": "DEBUG",
+            "信息": "INFO",
+            "警告": "WARNING",
+            "错误": "ERROR",
+            "严重": "CRITICAL"
+        }
+        
+        # 获取配置中的日志级别，如果是中文则转换为英文
+        config_log_level = self.config.get("log_level", "信息")
+        log_level = log_level_map.get(config_log_level, config_log_level)
+        
+        logging.basicConfig(
+            level=getattr(logging, log_level),
+            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            filename=os.path.join(self.config.get("download_dir"), "patent_downloader.log"),
+            filemode='a'
+        )
+        self.logger = logging.getLogger("PatentDownloader")
+    
+    def emit(self, event, *args):
+        """向监听者报告事件"""
+        if event in ("success", "failed"):
+            self.metrics.finish_patent(args[0], event == "success")
+        if self.listener:
+            self.listener(event, *args)
+    
+    @property
+    def driver(self):
+        return getattr(self._local, "driver", None)
+    
+    @driver.setter
+    def driver(self, value):
+        self._local.driver = value
+    
+    @property
+    def _search_page(self):
+        return getattr(self._local, "search_page", None)
+    
+    @_search_page.setter
+    def _search_page(self, value):
+        self._local.search_page = value
+    
+    def build_chrome_options(self, proxy=None):
+        """构建Chrome启动选项，proxy为该浏览器固定使用的代理"""
+        chrome_options = selenium_modules().Options()
+        if proxy:
+            chrome_options.add_argument(f'--proxy-server={proxy}')
+        
+        # 添加无头模式选项，提高性能
+        chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--window-size=1920,1080')
+        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36')
+        
+        # 内存优化
+        chrome_options.add_argument('--js-flags=--expose-gc')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--disable-sync')
+        chrome_options.add_argument('--disable-translate')
+        
+        # 只需要页面中的链接，精简模式下不加载图片、字体、媒体和第三方脚本
+        if self.config.get("lean_browsing", True):
+            apply_lean_options(chrome_options)
+        enable_traffic_log(chrome_options)
+        return chrome_options
+    
+    def ensure_driver(self):
+        """按需获取浏览器，只有HTTP解析失败时才需要；优先复用上次检索留下的热浏览器"""
+        proxy = getattr(self._local, "proxy", None)
+        if self.driver is not None and proxy and not self.proxy_pool.is_admitted(proxy):
+            # 所用代理被剔除时换一个代理重新启动浏览器
+            self.logger.info(f"代理已被剔除，更换浏览器: {proxy}")
+            self.quit_driver(keep_warm=False)
+        if self.driver is None:
+            self.emit("status", "正在准备浏览器...")
+            # 浏览器启动后无法更换代理，整个生命周期固定使用分配到的代理
+            self._local.proxy = None
+            if self.proxy_pool is not None:
+                self._local.proxy = self.proxy_pool.assign(threading.current_thread().name)
+            self._local.options = self.build_chrome_options(self._local.proxy)
+            with self.metrics.timer("browser_start"):
+                self.driver, reused = browser_sessions.acquire(self._local.options, self.config)
+            if reused:
+                self.metrics.count("browser_reused")
+                self.logger.info("复用已启动的浏览器")
+            if self.config.get("lean_browsing", True):
+                try:
+                    apply_lean_blocking(self.driver)
+                except Exception as e:
+                    self.logger.warning(f"设置请求拦截失败: {str(e)}")
+            with self._lock:
+                self._drivers.append(self.driver)
+        return self.driver
+    
+    def quit_driver(self, keep_warm=True):
+        """释放当前工作线程的浏览器：正常结束时留作热浏览器，被停止时直接关闭"""
+        driver = self.driver
+        if driver:
+            with self._lock:
+                if driver in self._drivers:
+                    self._drivers.remove(driver)
+            if keep_warm and self.is_running and self.config.get("keep_browser_warm", True):
+                browser_sessions.release(driver, self._local.options)
+            else:
+                browser_sessions.quit(driver)
+            self.driver = None
+        self._local.proxy = None
+    
+    def run(self):
+        try:
+            if self.index.duplicates or self.index.blank or self.index.invalid:
+                self.emit("status", f"已规范化专利号: {len(self.patents)} 个，去除重复 {self.index.duplicates} 行、"
+                                    f"空行 {self.index.blank} 行、无效 {self.index.invalid} 行")
+            
+            if self.source is not None:
+                # 读取线程边读边放入有界任务队列，立即开始处理；数量只用于进度和剩余时间，
+                # 来源未给出时在后台统计，大文件和压缩文件不必先完整读一遍
+                if self.source.total is not None:
+                    self.total_patents = self.metrics.total = self.source.total
+                else:
+                    threading.Thread(target=self.count_source, name="SourceCounter", daemon=True).start()
+                worker_total = self.worker_count
+                work_queue = queue.Queue(maxsize=worker_total * 4)
+                threading.Thread(target=self.feed_source, args=(work_queue, worker_total),
+                                 name="PatentSource", daemon=True).start()
+            else:
+                worker_total = min(self.worker_count, max(1, len(self.patents)))
+                work_queue = queue.Queue()
+                for patent in self.patents:
+                    work_queue.put(patent)
+                for _ in range(worker_total):
+                    work_queue.put(None)
+            
+            # 有界下载队列：解析线程产出 (专利号, PDF链接, 策略号)，下载线程消费
+            # 队列满时解析线程阻塞，形成背压；未满时解析线程提前解析后续专利
+            download_queue = queue.Queue(maxsize=self.config.get("download_queue_size", 8))
+            downloaders = []
+            for index in range(self.download_worker_count):
+                downloader = threading.Thread(target=self.download_loop, args=(download_queue,),
+                                              name=f"PdfDownloader-{index + 1}", daemon=True)
+                downloader.start()
+                downloaders.append(downloader)
+            
+            # 启动多个解析线程，各自持有一个浏览器，从共享队列取任务
+            workers = []
+            for index in range(worker_total):
+                worker = threading.Thread(target=self.worker_loop, args=(work_queue, download_queue),
+                                          name=f"PatentWorker-{index + 1}", daemon=True)
+                worker.start()
+                workers.append(worker)
+            for worker in workers:
+                worker.join()
+            
+            # 解析全部结束后通知下载线程退出
+            for _ in downloaders:
+                download_queue.put(None)
+            for downloader in downloaders:
+                downloader.join()
+            
+            self.emit("status", "检索完成")
+            self.logger.info(f"当前请求速率: {self.rate_control.summary()}")
+            if self.proxy_pool is not None:
+                self.logger.info(f"代理池: {self.proxy_pool.summary()}")
+            self.log_page_summary()
+            self.metrics.write(force=True)
+            self.emit("metrics", self.metrics.throughput())
+            if self.blob_store:
+                patents, blobs = self.blob_store.stats()
+                self.logger.info(f"内容去重: {patents} 个专利共 {blobs} 份不同内容")
+            
+        except Exception as e:
+            self.error = e
+            error_msg = f"发生错误: {str(e)}"
+            self.emit("status", error_msg)
+            self.logger.error(error_msg)
+        finally:
+            if self.source_tracker is not None:
+                self.emit_source_offset(force=True)
+            if self.http_resolver:
+                self.http_resolver.close()
+            self.fetcher.close()
+            self.strategy_stats.save()
+            self.download_history.close()
+            if self.url_cache:
+                self.url_cache.close()
+    
+    def worker_loop(self, work_queue, download_queue):
+        """解析线程：不断从队列取专利解析PDF链接，直到队列为空或被停止"""
+        try:
+            while self.is_running:
+                try:
+                    patent = work_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if patent is None:
+                    break
+                try:
+                    self.process_patent(patent, download_queue)
+                except Exception as e:
+                    error_msg = f"处理专利出错 {patent}: {str(e)}"
+                    self.emit("status", error_msg)
+                    self.logger.error(error_msg)
+                    # 报告失败，任务队列据此放回队列重试，而不是当作已跳过
+                    self.emit("failed", patent)
+                    self.mark_processed(patent)
+        finally:
+            self.quit_driver()
+    
+    def feed_source(self, work_queue, worker_total):
+        """读取线程：从来源逐个读出专利号放入有界任务队列，队列满时等待，读完后通知解析线程退出"""
+        try:
+            for raw, offset in self.source:
+                patent = normalize_patent_id(raw)
+                if patent is None:
+                    continue
+                # 同一专利号仍在排队或处理中时跳过重复行，避免两个线程同时写同一个临时文件；
+                # 前一次处理完后再出现的重复行照常放入，由下载历史判断是否跳过
+                with self._lock:
+                    repeat = patent in self._in_flight
+                    self._in_flight.add(patent)
+                if repeat:
+                    self.skip_repeat(offset)
+                    continue
+                if self.source_tracker is not None:
+                    self.source_tracker.issue(patent, offset)
+                if not self.put_while_running(work_queue, patent):
+                    return
+            if self.source_tracker is not None:
+                self.source_tracker.close(self.source.end_offset)
+        except Exception as e:
+            error_msg = f"读取专利号文件出错: {str(e)}"
+            self.emit("status", error_msg)
+            self.logger.error(error_msg)
+        finally:
+            for _ in range(worker_total):
+                if not self.put_while_running(work_queue, None):
+                    break
+    
+    def count_source(self):
+        """后台统计来源中的专利数量，完成前不报告进度百分比"""
+        try:
+            total = self.source.count()
+        except Exception as e:
+            self.logger.warning(f"统计专利号数量失败: {str(e)}")
+            return
+        self.total_patents = self.metrics.total = total
+        self.update_progress()
+    
+    def skip_repeat(self, offset):
+        """跳过的重复行计入进度和去重数，偏移随之前读入的专利一起推进"""
+        with self._lock:
+            self.processed_patents += 1
+            self.index.duplicates += 1
+        self.update_progress()
+        self.metrics.mark_processed()
+        if self.source_tracker is not None:
+            self.source_tracker.skip(offset)
+    
+    def is_abandoned(self, patent):
+        """来源已不再要求处理该专利（任务租约被其他进程接管），正在进行的下载随之中止"""
+        return self.source is not None and self.source.abandoned(patent)
+    
+    def put_while_running(self, target_queue, item):
+        """阻塞等待队列空位，期间响应停止请求；已停止时返回False"""
+        while self.is_running:
+            try:
+                target_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def emit_source_offset(self, force=False):
+        """报告专利号文件中可续读的偏移，最多每秒一次"""
+        now = time.time()
+        if not force and now - self._source_emitted < 1.0:
+            return
+        self._source_emitted = now
+        self.emit("source", self.source_tracker.offset, self.source_tracker.exhausted)
+    
+    def download_loop(self, download_queue):
+        """下载线程：从下载队列取已解析的链接下载，收到None时退出"""
+        try:
+            while True:
+                item = download_queue.get()
+                if item is None:
+                    break
+                patent, pdf_url, strategy_num, from_cache = item
+                # 已停止时只排空队列，保证解析线程不会阻塞在put上
+                if not self.is_running:
+                    continue
+                self.metrics.bind(patent)
+                if self.is_abandoned(patent):
+                    self.mark_processed(patent)
+                    continue
+                try:
+                    success, status_code = self.download_with_retry(pdf_url, patent)
+                    if not success and from_cache and status_code in (404, 410):
+                        # 缓存的链接已失效，作废后重新解析一次
+                        self.url_cache.invalidate(patent)
+                        strategy_num, pdf_url = self.resolve_pdf_url(patent)
+                        if pdf_url:
+                            self.url_cache.put(patent, pdf_url, strategy_num)
+                            success, status_code = self.download_with_retry(pdf_url, patent)
+                    if success:
+                        self.emit("log", patent, f"{patent}.pdf", strategy_num)
+                        self.emit("success", patent)  # 发送成功信号
+                        self.record_success(patent, pdf_url, strategy_num)
+                    elif self.is_abandoned(patent):
+                        self.emit("status", f"任务已由其他进程接管，放弃下载: {patent}")
+                    else:
+                        self.emit("failed", patent)
+                except Exception as e:
+                    error_msg = f"下载专利出错 {patent}: {str(e)}"
+                    self.emit("status", error_msg)
+                    self.logger.error(error_msg)
+                    self.emit("failed", patent)
+                self.mark_processed(patent)
+        finally:
+            self.quit_driver()
+    
+    def process_patent(self, patent, download_queue):
+        """处理单个专利：跳过检查、解析链接，解析成功后交给下载队列"""
+        patent = patent.strip()
+        if not patent:
+            self.mark_processed(patent)
+            return
+        self.metrics.bind(patent)
+        if self.is_abandoned(patent):
+            self.mark_processed(patent)
+            return
+        
+        # 断点续传检查：文件须与清单一致或重新校验通过，残缺文件重新下载
+        file_path = os.path.join(self.config.get("download_dir"), f"{patent}.pdf")
+        verified = os.path.exists(file_path) and self.is_file_verified(file_path)
+        if verified and self.download_history.is_downloaded(patent):
+            self.emit("status", f"跳过已下载: {patent}")
+            self.mark_processed(patent)
+            return
+        
+        # 检查文件是否已存在
+        if verified:
+            self.emit("status", f"文件已存在: {patent}")
+            self.emit("log", patent, f"{patent}.pdf", 0)  # 策略0表示文件已存在
+            self.emit("success", patent)
+            self.record_success(patent, strategy=0)
+            self.mark_processed(patent)
+            return
+            
+        # 先查链接缓存，命中则完全跳过解析
+        pdf_url, strategy_num = self.url_cache.get(patent) if self.url_cache else (None, None)
+        from_cache = pdf_url is not None
+        if from_cache:
+            self.emit("status", f"使用缓存链接: {patent}")
+        else:
+            self.emit("status", f"正在检索: {patent}")
+            
+            # 尝试通过搜索页面查找专利
+            strategy_num, pdf_url = self.resolve_pdf_url(patent)
+            if pdf_url and self.url_cache:
+                self.url_cache.put(patent, pdf_url, strategy_num)
+        
+        if not pdf_url:
+            self.emit("failed", patent)
+            self.mark_processed(patent)
+        else:
+            # 阻塞等待下载队列空位，期间响应停止请求
+            self.put_while_running(download_queue, (patent, pdf_url, strategy_num, from_cache))
+        
+        # 内存管理 - 定期清理
+        self._local.pages = getattr(self._local, "pages", 0) + 1
+        if self.driver and self._local.pages % 10 == 0:
+            try:
+                self.driver.execute_script("window.gc();")
+            except Exception as e:
+                self.logger.debug(f"浏览器内存清理失败: {str(e)}")
+    
+    def is_file_verified(self, file_path):
+        """清单中有记录且大小、修改时间未变则直接信任，否则读取文件重新校验"""
+        if self.manifest.is_verified(file_path):
+            return True
+        check = verify_pdf_file(file_path)
+        error = check.error()
+        if error:
+            self.emit("status", f"文件不完整({error})，重新下载: {os.path.basename(file_path)}")
+            self.manifest.remove(file_path)
+            return False
+        self.manifest.record(file_path, check.hexdigest())
+        return True
+    
+    def record_success(self, patent, pdf_url=None, strategy=None):
+        """记录成功下载的专利"""
+        file_path = os.path.join(self.config.get("download_dir"), f"{patent}.pdf")
+        size = os.path.getsize(file_path) if os.path.exists(file_path) else None
+        self.download_history.upsert(patent, "success", url=pdf_url, size=size, strategy=strategy)
+    
+    def mark_processed(self, patent=None):
+        """线程安全地累加已处理数量并更新进度；以文件为来源时推进可续读的偏移"""
+        with self._lock:
+            self.processed_patents += 1
+            processed = self.processed_patents
+        self.update_progress()
+        self.metrics.mark_processed(patent or None)
+        if self.metrics.write():
+            self.emit("metrics", self.metrics.throughput())
+        if self.source is not None and patent:
+            with self._lock:
+                self._in_flight.discard(patent)
+            self.source.done(patent)
+            if self.source_tracker is not None:
+                self.source_tracker.done(patent)
+                self.emit_source_offset()
+        return processed
+
+    def resolve_pdf_url(self, patent):
+        """依次尝试各策略解析PDF链接，返回 (策略号, PDF链接)"""
+        resolution = self.strategy_stats.resolution(patent)
+        try:
+            self._search_page = None
+            
+            # 尝试所有策略，HTTP解析不需要浏览器，放在最前；关闭浏览器策略时只用HTTP解析
+            strategies = []
+            if self.config.get("browser_strategies", True):
+                strategies = [
+                    (1, self.test_strategy1),
+                    (2, self.test_strategy2),
+                    (3, self.test_strategy3),
+                    (4, self.test_strategy4),
+                    (5, self.test_strategy5)
+                ]
+            if self.http_resolver:
+                strategies.insert(0, (6, self.test_strategy6))
+            
+            # 按该类专利历史上预期成功耗时最短的顺序尝试
+            strategies = self.strategy_stats.order(patent, strategies)
+            
+            for i, strategy in strategies:
+                if not self.is_running:
+                    return None, None
+                    
+                retry_count = 0
+                max_retries = self.config.get("retry_count", 3)
+                start_time = time.time()
+                
+                while retry_count < max_retries:
+                    attempt_start = time.time()
+                    try:
+                        success, pdf_url = strategy(patent)
+                        self.metrics.observe(f"strategy_{i}", time.time() - attempt_start)
+                        self.metrics.strategy_result(i, success)
+                        resolution.record(i, time.time() - start_time, success)
+                        if success:
+                            return i, pdf_url
+                        break  # 如果策略失败，尝试下一个策略
+                    except Exception as e:
+                        self.metrics.observe(f"strategy_{i}", time.time() - attempt_start)
+                        self.metrics.count("retries")
+                        retry_count += 1
+                        error_msg = f"策略{i}尝试{retry_count}/{max_retries}失败: {str(e)}"
+                        self.logger.warning(error_msg)
+                        self.emit("status", error_msg)
+                        if retry_count >= max_retries:
+                            resolution.record(i, time.time() - start_time, False)
+                        # 无需固定等待，重试的请求会由限速器按当前速率放行
+            
+            return None, None
+                
+        except Exception as e:
+            error_msg = f"搜索专利时出错: {str(e)}"
+            self.emit("status", error_msg)
+            self.logger.error(error_msg)
+            return None, None
+        finally:
+            resolution.close()
+
+    def download_with_retry(self, pdf_url, patent_id):
+        """下载失败属于暂时性错误（超时、连接中断、限流、5xx、数据不完整）时重试，最多retry_count次"""
+        max_retries = max(1, int(self.config.get("retry_count", 3)))
+        temp_file_path = os.path.join(self.config.get("download_dir"), f"{patent_id}.pdf.tmp")
+        for attempt in range(1, max_retries + 1):
+            success, status_code = self.download_pdf(pdf_url, patent_id)
+            if success or not self.is_running or self.is_abandoned(patent_id) or attempt >= max_retries:
+                return success, status_code
+            # 数据不完整时.tmp被保留，重试从断点继续
+            truncated = status_code in (200, 206) and os.path.exists(temp_file_path)
+            if not (status_code is None or status_code >= 500 or truncated):
+                return success, status_code
+            self.metrics.count("retries")
+            self.emit("status", f"下载尝试{attempt}/{max_retries}失败，重试: {patent_id}")
+            # 无需固定等待，重试的请求会由限速器按当前速率放行
+        return success, status_code
+    
+    def download_pdf(self, pdf_url, patent_id):
+        """下载PDF文件，支持断点续传，返回 (是否成功, HTTP状态码)"""
+        file_path = os.path.join(self.config.get("download_dir"), f"{patent_id}.pdf")
+        
+        # 同一链接的内容已经下载过，直接链接，不走网络
+        if self.blob_store:
+            sha256 = self.blob_store.link_from_url(pdf_url, file_path, patent_id)
+            if sha256:
+                self.manifest.record(file_path, sha256, url=pdf_url)
+                self.metrics.count("deduplicated")
+                self.emit("status", f"内容已存在，已链接: {patent_id}")
+                return True, None
+        
+        with self.metrics.timer("download"):
+            success, status_code = self.fetcher.fetch(pdf_url, file_path, label=patent_id,
+                                                      report=lambda message: self.emit("status", message),
+                                                      is_running=lambda: self.is_running and not self.is_abandoned(patent_id))
+        if success:
+            self.metrics.add_bytes(os.path.getsize(file_path))
+        
+        # 登记下载内容，与已有文件内容相同时改为链接
+        if success and self.blob_store:
+            entry = self.manifest.get(file_path)
+            if entry and self.blob_store.add(patent_id, file_path, entry["sha256"], pdf_url):
+                self.manifest.record(file_path, entry["sha256"], url=pdf_url)
+        return success, status_code
+
+    def update_progress(self):
+        if not self.total_patents:
+            return  # 数量还在统计中
+        progress = min(100, int((self.processed_patents / self.total_patents) * 100))
+        self.emit("progress", progress)
+
+    def stop(self):
+        self.is_running = False
+        with self._lock:
+            drivers = list(self._drivers)
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                pass
+    
+    def open_page(self, url):
+        """经限速器放行后加载页面，识别超时和人机验证页并反馈给限速器"""
+        self.ensure_driver()
+        if self.rate_control.acquire(url, lambda: self.is_running) is None:
+            raise RateLimited("已停止")
+        start_time = time.time()
+        try:
+            self.driver.get(url)
+        except selenium_modules().TimeoutException:
+            self.metrics.observe("page_load", time.time() - start_time)
+            self.rate_control.throttle(url, "页面加载超时")
+            self.report_proxy(False)
+            raise RateLimited(f"页面加载超时: {url}")
+        elapsed = time.time() - start_time
+        self.metrics.observe("page_load", elapsed)
+        self.record_page_traffic(url, elapsed)
+        
+        page_text = self.driver.execute_script("return document.body ? document.body.innerText.slice(0, 5000) : '';")
+        if looks_like_bot_check(self.driver.current_url, page_text):
+            self.rate_control.throttle(url, "人机验证页")
+            self.report_proxy(False)
+            raise RateLimited(f"遇到人机验证页: {url}")
+        self.rate_control.success(url)
+        self.report_proxy(True, elapsed)
+    
+    def report_proxy(self, ok, latency=None):
+        """把当前浏览器页面加载的结果计入其代理的评分"""
+        proxy = getattr(self._local, "proxy", None)
+        if proxy:
+            self.proxy_pool.report(proxy, ok, latency)
+    
+    def record_page_traffic(self, url, elapsed):
+        """记录页面流量、被拦截的请求数和加载耗时"""
+        try:
+            transferred, blocked = page_traffic(self.driver)
+        except Exception as e:
+            self.logger.debug(f"读取页面流量失败: {str(e)}")
+            return
+        with self._lock:
+            stats = self.page_stats
+            stats["pages"] += 1
+            stats["bytes"] += transferred
+            stats["blocked"] += blocked
+            stats["time"] += elapsed
+        self.logger.debug(f"页面加载 {url}: {transferred / 1024:.1f} KB, 拦截 {blocked} 个请求, 耗时 {elapsed:.2f}s")
+    
+    def log_page_summary(self):
+        """输出本次运行的页面流量汇总，并与另一种浏览模式的历史平均值对比"""
+        stats = self.page_stats
+        if not stats["pages"]:
+            return
+        mode = "lean" if self.config.get("lean_browsing", True) else "full"
+        stats_file = os.path.join(self.config.get("download_dir"), "page_stats.json")
+        try:
+            history = {}
+            if os.path.exists(stats_file):
+                with open(stats_file, 'r', encoding='utf-8') as f:
+                    history = json.load(f)
+            totals = history.setdefault(mode, {"pages": 0, "bytes": 0, "time": 0.0})
+            for key in totals:
+                totals[key] += stats[key]
+            with open(stats_file, 'w', encoding='utf-8') as f:
+                json.dump(history, f, ensure_ascii=False, indent=4)
+        except Exception as e:
+            self.logger.warning(f"保存页面流量统计失败: {str(e)}")
+            history = {}
+        
+        average_kb = stats["bytes"] / stats["pages"] / 1024
+        average_time = stats["time"] / stats["pages"]
+        self.logger.info(
+            f"{'精简' if mode == 'lean' else '完整'}浏览模式: 共加载 {stats['pages']} 个页面, "
+            f"平均每页 {average_kb:.1f} KB、{average_time:.2f}s, 共拦截 {stats['blocked']} 个请求"
+        )
+        baseline = history.get("full")
+        if mode == "lean" and baseline and baseline["pages"]:
+            saved_kb = baseline["bytes"] / baseline["pages"] / 1024 - average_kb
+            saved_time = baseline["time"] / baseline["pages"] - average_time
+            self.logger.info(f"相比完整浏览模式平均每页节省 {saved_kb:.1f} KB、{saved_time:.2f}s, "
+                             f"本次共节省约 {saved_kb * stats['pages'] / 1024:.1f} MB、{saved_time * stats['pages']:.0f}s")
+    
+    # 以下是各种检索策略
+    def load_search_page(self, patent):
+        """每个专利只加载一次搜索页，一次脚本调用收集策略1-4的全部候选链接；
+        加载失败（限流、超时等）同样只尝试一次，之后的策略和重试直接得到空结果"""
+        if self._search_page and self._search_page[0] == patent:
+            return self._search_page[1] or {}
+        
+        search_url = self.config.get("search_url", DEFAULT_SEARCH_URL).format(patent=patent)
+        try:
+            self.open_page(search_url)
+            
+            # 候选链接或“无结果”提示一出现立即继续，没有固定等待
+            outcome = wait_for_any(self.driver, SEARCH_LINK_SELECTORS, empty_texts=SEARCH_EMPTY_TEXTS,
+                                   timeout=self.config.get("element_wait_timeout", 10))
+            candidates = {} if outcome == EMPTY else self.collect_search_candidates()
+        except Exception:
+            self._search_page = (patent, None)
+            raise
+        
+        self._search_page = (patent, candidates)
+        return candidates
+    
+    def collect_search_candidates(self):
+        """在已加载的页面上执行各策略的选择器，返回 {策略号: 链接}"""
+        result = self.driver.execute_script(SEARCH_CANDIDATES_SCRIPT) or {}
+        return {int(key): url for key, url in result.items() if url}
+    
+    def test_strategy1(self, patent):
+        """策略1：使用组合选择器定位"""
+        try:
+            pdf_url = self.load_search_page(patent).get(1)
+            if pdf_url:
+                return True, pdf_url
+            return False, None
+        except RateLimited:
+            raise
+        except Exception as e:
+            self.logger.debug(f"策略1失败: {str(e)}")
+            return False, None
+
+    def test_strategy2(self, patent):
+        """策略2：从页面源码提取PDF链接"""
+        try:
+            pdf_url = self.load_search_page(patent).get(2)
+            if pdf_url:
+                return True, pdf_url
+            return False, None
+        except RateLimited:
+            raise
+        except Exception as e:
+            self.logger.debug(f"策略2失败: {str(e)}")
+            return False, None
+
+    def test_strategy3(self, patent):
+        """策略3：使用精确的CSS选择器定位PDF元素"""
+        try:
+            pdf_url = self.load_search_page(patent).get(3)
+            if pdf_url:
+                return True, pdf_url
+            return False, None
+        except RateLimited:
+            raise
+        except Exception as e:
+            self.logger.debug(f"策略3失败: {str(e)}")
+            return False, None
+
+    def test_strategy4(self, patent):
+        """策略4：使用XPath定位PDF元素"""
+        try:
+            pdf_url = self.load_search_page(patent).get(4)
+            if pdf_url:
+                return True, pdf_url
+            return False, None
+        except RateLimited:
+            raise
+        except Exception as e:
+            self.logger.debug(f"策略4失败: {str(e)}")
+            return False, None
+
+    def test_strategy5(self, patent):
+        """策略5：直接访问专利页面"""
+        try:
+            template = self.config.get("patent_page_url") or HttpResolver.DEFAULT_PATENT_URL
+            self.open_page(template.format(patent=patent))
+            
+            outcome = wait_for_any(self.driver, PATENT_LINK_SELECTORS, empty_texts=PATENT_EMPTY_TEXTS,
+                                   timeout=self.config.get("element_wait_timeout", 10))
+            if outcome == EMPTY:
+                return False, None
+            
+            se = selenium_modules()
+            for selector in PATENT_LINK_SELECTORS:
+                pdf_links = self.driver.find_elements(se.By.CSS_SELECTOR, selector)
+                if pdf_links:
+                    pdf_url = pdf_links[0].get_attribute("href")
+                    if pdf_url:
+                        return True, pdf_url
+            
+            return False, None
+        except RateLimited:
+            raise
+        except Exception as e:
+            self.logger.debug(f"策略5失败: {str(e)}")
+            return False, None
+    def test_strategy6(self, patent):
+        """策略6：不启动浏览器，直接请求专利页面解析PDF链接"""
+        try:
+            success, pdf_url = self.http_resolver.resolve(patent, lambda: self.is_running)
+            if success:
+                self.logger.info(f"策略6成功 (HTTP解析): {patent}")
+            return success, pdf_url
+        except RateLimited:
+            raise
+        except Exception as e:
+            self.logger.debug(f"策略6失败: {str(e)}")
+            return False, None
@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+HISTORY_DB = "download_history.db"
+HISTORY_JSON = "download_history.json"
+
+
+def connect(download_dir, db_name=HISTORY_DB, journal_mode="WAL"):
+    """打开下载目录中的SQLite数据库，默认使用WAL模式以便并发读写
+
+    WAL依赖共享内存，下载目录放在网络文件系统上供多台主机共用时须改用DELETE（回滚日志）
+    """
+    os.makedirs(download_dir, exist_ok=True)
+    conn = sqlite3.connect(os.path.join(download_dir, db_name), timeout=30, check_same_thread=False)
+    journal_mode = (journal_mode or "WAL").upper()
+    conn.execute(f"PRAGMA journal_mode={journal_mode}")
+    if journal_mode == "WAL":
+        conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class DownloadHistory:
+    """下载历史记录，按专利增量写入SQLite，批量提交"""
+
+    def __init__(self, download_dir, batch_size=50, commit_interval=2.0, journal_mode="WAL"):
+        self.download_dir = download_dir
+        self.batch_size = max(1, batch_size)
+        self.commit_interval = commit_interval
+        self.logger = logging.getLogger("DownloadHistory")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_commit = time.time()
+        self.conn = connect(download_dir, journal_mode=journal_mode)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS history (
+                patent TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                time TEXT,
+                url TEXT,
+                size INTEGER,
+                strategy INTEGER
+            )
+        """)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.commit()
+        self.import_json()
+
+    def import_json(self):
+        """首次使用时导入旧版 download_history.json"""
+        json_file = os.path.join(self.download_dir, HISTORY_JSON)
+        with self._lock:
+            imported = self.conn.execute("SELECT value FROM meta WHERE key = 'json_imported'").fetchone()
+            if imported or not os.path.exists(json_file):
+                return
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    records = json.load(f)
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO history (patent, status, time) VALUES (?, ?, ?)",
+                    [(patent, record.get("status", "success"), record.get("time"))
+                     for patent, record in records.items()]
+                )
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('json_imported', ?)",
+                                  (time.strftime("%Y-%m-%d %H:%M:%S"),))
+                self.conn.commit()
+                self.logger.info(f"已导入旧版下载历史 {len(records)} 条")
+            except Exception as e:
+                self.conn.rollback()
+                self.logger.error(f"导入下载历史失败: {str(e)}")
+
+    def __contains__(self, patent):
+        with self._lock:
+            return self.conn.execute("SELECT 1 FROM history WHERE patent = ?", (patent,)).fetchone() is not None
+
+    def is_downloaded(self, patent):
+        """是否已成功下载过"""
+        with self._lock:
+            row = self.conn.execute("SELECT status FROM history WHERE patent = ?", (patent,)).fetchone()
+        return row is not None and row[0] == "success"
+
+    def get(self, patent):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT patent, status, time, url, size, strategy FROM history WHERE patent = ?", (patent,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("patent", "status", "time", "url", "size", "strategy"), row))
+
+    def upsert(self, patent, status="success", url=None, size=None, strategy=None):
+        """写入或更新一条记录，达到批量大小或时间间隔时提交"""
+        with self._lock:
+            self.conn.execute("""
+                INSERT INTO history (patent, status, time, url, size, strategy) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(patent) DO UPDATE SET
+                    status = excluded.status,
+                    time = excluded.time,
+                    url = COALESCE(excluded.url, history.url),
+                    size = COALESCE(excluded.size, history.size),
+                    strategy = COALESCE(excluded.strategy, history.strategy)
+            """, (patent, status, time.strftime("%Y-%m-%d %H:%M:%S"), url, size, strategy))
+            self._written()
+
+    def _written(self):
+        """记一次未提交的写入，达到批量大小或时间间隔时提交；调用方须持有锁"""
+        self._pending += 1
+        if self._pending >= self.batch_size or time.time() - self._last_commit >= self.commit_interval:
+            self._commit()
+
+    def _commit(self):
+        self.conn.commit()
+        self._pending = 0
+        self._last_commit = time.time()
+
+    def commit(self):
+        with self._lock:
+            self._commit()
+
+    def count(self, status="success"):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM history WHERE status = ?", (status,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            try:
+                self._commit()
+                self.conn.close()
+            except Exception as e:
+                self.logger.error(f"关闭下载历史失败: {str(e)}")
+
+
+class FileManifest:
+    """已校验文件清单：记录文件大小、修改时间和SHA-256，跳过和续传检查以清单为准而不只看文件是否存在
+
+    与下载历史共用同一个数据库连接和锁，避免两个连接争抢写锁；写入随下载历史一起批量提交
+    """
+
+    def __init__(self, history):
+        self.history = history
+        self.conn = history.conn
+        self._lock = history._lock
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS manifest (
+                file TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                url TEXT,
+                time TEXT
+            )
+        """)
+        self.conn.commit()
+
+    def record(self, file_path, sha256, url=None):
+        """文件校验通过后记入清单"""
+        stat = os.stat(file_path)
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO manifest (file, size, mtime_ns, sha256, url, time) VALUES (?, ?, ?, ?, ?, ?)",
+                (os.path.basename(file_path), stat.st_size, stat.st_mtime_ns, sha256, url,
+                 time.strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            self.history._written()
+
+    def get(self, file_path):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT file, size, mtime_ns, sha256, url, time FROM manifest WHERE file = ?",
+                (os.path.basename(file_path),)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("file", "size", "mtime_ns", "sha256", "url", "time"), row))
+
+    def is_verified(self, file_path):
+        """文件存在且大小、修改时间与清单一致"""
+        entry = self.get(file_path)
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        return stat.st_size == entry["size"] and stat.st_mtime_ns == entry["mtime_ns"]
+
+    def remove(self, file_path):
+        with self._lock:
+            self.conn.execute("DELETE FROM manifest WHERE file = ?", (os.path.basename(file_path),))
+            self.history._written()
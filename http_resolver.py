@@ -0,0 +1,112 @@
+import re
+import time
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limiter import RateLimited, looks_like_bot_check
+from proxy_pool import requests_proxies
+
+# 专利详情页静态HTML中PDF链接的几种出现形式
+CITATION_PDF_PATTERNS = [
+    re.compile(r'<meta[^>]+name="citation_pdf_url"[^>]+content="([^"]+)"', re.IGNORECASE),
+    re.compile(r'<meta[^>]+content="([^"]+)"[^>]+name="citation_pdf_url"', re.IGNORECASE),
+]
+PDF_HREF_PATTERN = re.compile(r'href="(https?://patentimages\.storage\.googleapis\.com/[^"]+\.pdf)"', re.IGNORECASE)
+
+
+class HttpResolver:
+    """无浏览器PDF链接解析器，直接请求专利页面的静态HTML并提取PDF链接"""
+    DEFAULT_PATENT_URL = "https://patents.google.com/patent/{patent}/en"
+    USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36'
+
+    def __init__(self, config, rate_control=None, proxy_pool=None):
+        self.config = config
+        self.rate_control = rate_control
+        self.proxy_pool = proxy_pool
+        self.logger = logging.getLogger("HttpResolver")
+        self.session = requests.Session()
+
+        # 连接池复用，避免每个专利都重新握手
+        pool_size = max(8, int(self.config.get("workers", 1)))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            'User-Agent': self.USER_AGENT,
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+        })
+
+        # 设置代理：有代理池时按请求从池中选取，否则使用单个代理
+        if self.proxy_pool is None and self.config.get("proxy"):
+            self.session.proxies = requests_proxies(self.config.get("proxy"))
+
+    def page_url(self, patent):
+        """生成专利详情页地址，可通过配置指向本地替身服务器"""
+        template = self.config.get("patent_page_url") or self.DEFAULT_PATENT_URL
+        return template.format(patent=patent)
+
+    def resolve(self, patent, is_running=None):
+        """请求专利页面并解析PDF链接，返回 (是否成功, PDF链接)"""
+        url = self.page_url(patent)
+        if self.rate_control and self.rate_control.acquire(url, is_running) is None:
+            return False, None
+
+        # 同一个解析线程固定使用同一个代理，超时、连接错误和限流都计为该代理的失败
+        proxy = None
+        if self.proxy_pool is not None:
+            proxy = self.proxy_pool.acquire(threading.current_thread().name, is_running)
+            if proxy is None:
+                return False, None
+        started = time.perf_counter()
+        proxy_ok = False
+        try:
+            try:
+                response = self.session.get(url, timeout=self.config.get("timeout", 30),
+                                            proxies=requests_proxies(proxy))
+            except requests.exceptions.Timeout:
+                if self.rate_control:
+                    self.rate_control.throttle(url, "超时")
+                raise RateLimited(f"请求超时: {url}")
+            except (requests.exceptions.ProxyError, requests.exceptions.ConnectionError):
+                if proxy is None:
+                    raise
+                # 代理不可用不代表专利不存在，按限流处理以便换一个代理重试
+                raise RateLimited(f"代理连接失败 {proxy}: {url}")
+            proxy_ok = response.status_code not in (429, 503)
+        finally:
+            if proxy is not None:
+                self.proxy_pool.release(proxy, proxy_ok, time.perf_counter() - started)
+
+        if response.status_code in (429, 503) or looks_like_bot_check(response.url, response.text):
+            if self.rate_control:
+                self.rate_control.throttle(url, f"HTTP {response.status_code}")
+            raise RateLimited(f"被限流 HTTP {response.status_code}: {url}")
+        if self.rate_control:
+            self.rate_control.success(url)
+
+        if response.status_code != 200:
+            self.logger.debug(f"HTTP解析 {patent} 返回 {response.status_code}")
+            return False, None
+
+        pdf_url = self.extract_pdf_url(response.text)
+        if pdf_url:
+            return True, pdf_url
+        return False, None
+
+    @staticmethod
+    def extract_pdf_url(html):
+        """从页面HTML中提取PDF链接，优先使用citation_pdf_url元数据"""
+        for pattern in CITATION_PDF_PATTERNS:
+            match = pattern.search(html)
+            if match:
+                return match.group(1)
+
+        match = PDF_HREF_PATTERN.search(html)
+        if match:
+            return match.group(1)
+        return None
+
+    def close(self):
+        self.session.close()
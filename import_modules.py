@@ -1,4 +1,5 @@
 # 显式导入所有需要的模块，确保打包时包含它们
+# 运行时不再导入本模块，run.py 中的 collect_modules_for_packager 仅用于让打包工具发现它
 try:
     import sys
     import os
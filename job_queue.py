@@ -0,0 +1,292 @@
+import os
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from patent_source import PatentSource
+
+JOB_QUEUE_DB = "job_queue.db"
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobQueue:
+    """多进程、多主机共享的专利任务队列：工作进程限时租用任务，定期续租，
+    进程崩溃或租约过期后任务自动回到可领取状态
+
+    数据库放在共享的下载目录中；使用回滚日志而不是WAL，因为WAL依赖共享内存，
+    在网络文件系统上不可用
+    """
+
+    def __init__(self, path, lease_seconds=300, max_attempts=3, worker_id=None):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.worker_id = worker_id or default_worker_id()
+        self.logger = logging.getLogger("JobQueue")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=DELETE")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                patent TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                owner TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated TEXT,
+                result TEXT
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, lease_until)")
+
+    def _transaction(self, statements):
+        """在一个写事务中执行 statements(conn)，BEGIN IMMEDIATE保证多个进程领取时不会重复"""
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self.conn)
+                self.conn.execute("COMMIT")
+                return result
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def now_text():
+        return time.strftime("%Y-%m-%d %H:%M:%S")
+
+    def enqueue(self, patents, history=None):
+        """加入任务，已存在的专利和下载历史中已成功的专利不重复加入，返回新增数量"""
+        rows = [(patent, PENDING, self.now_text()) for patent in patents
+                if not (history is not None and history.is_downloaded(patent))]
+
+        def insert(conn):
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO jobs (patent, status, updated) VALUES (?, ?, ?)", rows)
+            return conn.total_changes - before
+        return self._transaction(insert)
+
+    def claim(self, limit=10):
+        """领取最多limit个待处理或租约已过期的任务；租约过期且已达最大尝试次数的任务标记为失败，
+        避免每次都让工作进程崩溃或卡死的专利被无限次领取"""
+        now = time.time()
+
+        def take(conn):
+            conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL, updated = ?, result = ? "
+                "WHERE status = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, self.now_text(), "lease expired", LEASED, now, self.max_attempts)
+            )
+            patents = [row[0] for row in conn.execute(
+                "SELECT patent FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) LIMIT ?",
+                (PENDING, LEASED, now, limit)
+            )]
+            conn.executemany(
+                "UPDATE jobs SET status = ?, owner = ?, lease_until = ?, attempts = attempts + 1, updated = ? "
+                "WHERE patent = ?",
+                [(LEASED, self.worker_id, now + self.lease_seconds, self.now_text(), patent) for patent in patents]
+            )
+            return patents
+        return self._transaction(take)
+
+    def renew(self, patents):
+        """为仍由本进程持有的任务续租，返回续租成功的专利；其余的租约已过期并被其他进程领取或已结束"""
+        until = time.time() + self.lease_seconds
+
+        def extend(conn):
+            return {patent for patent in patents if conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE patent = ? AND owner = ? AND status = ?",
+                (until, patent, self.worker_id, LEASED)
+            ).rowcount}
+        return self._transaction(extend)
+
+    def complete(self, patent, result=None):
+        self._finish(patent, DONE, result)
+
+    def fail(self, patent, result=None):
+        """处理失败：未达到最大尝试次数时放回队列，否则标记为失败"""
+        def update(conn):
+            row = conn.execute("SELECT attempts FROM jobs WHERE patent = ? AND owner = ?",
+                               (patent, self.worker_id)).fetchone()
+            status = FAILED if row is None or row[0] >= self.max_attempts else PENDING
+            conn.execute(
+                "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL, updated = ?, result = ? "
+                "WHERE patent = ? AND owner = ?",
+                (status, self.now_text(), result, patent, self.worker_id)
+            )
+        self._transaction(update)
+
+    def _finish(self, patent, status, result):
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL, updated = ?, result = ? "
+            "WHERE patent = ? AND owner = ?",
+            (status, self.now_text(), result, patent, self.worker_id)
+        ))
+
+    def release(self, patents):
+        """归还未处理完的任务（被停止时），不计入尝试次数"""
+        self._transaction(lambda conn: conn.executemany(
+            "UPDATE jobs SET status = ?, owner = NULL, lease_until = NULL, attempts = MAX(attempts - 1, 0), "
+            "updated = ? WHERE patent = ? AND owner = ? AND status = ?",
+            [(PENDING, self.now_text(), patent, self.worker_id, LEASED) for patent in patents]
+        ))
+
+    def counts(self):
+        """各状态的任务数，租约已过期的计入pending"""
+        now = time.time()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT CASE WHEN status = ? AND lease_until < ? THEN ? ELSE status END, COUNT(*) "
+                "FROM jobs GROUP BY 1", (LEASED, now, PENDING)
+            ).fetchall()
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class LeaseKeeper:
+    """后台线程定期为当前持有的任务续租；续租失败说明租约已被其他进程接管，这些任务记为已失去"""
+
+    def __init__(self, job_queue, patents=()):
+        self.job_queue = job_queue
+        self.patents = set(patents)
+        self.lost = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="LeaseKeeper", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def add(self, patents):
+        with self._lock:
+            self.patents.update(patents)
+
+    def done(self, patent):
+        """该任务已上报结果，不再续租；返回此前是否持有该任务"""
+        with self._lock:
+            held = patent in self.patents
+            self.patents.discard(patent)
+            self.lost.discard(patent)
+            return held
+
+    def is_lost(self, patent):
+        with self._lock:
+            return patent in self.lost
+
+    def remaining(self):
+        with self._lock:
+            return set(self.patents)
+
+    def _run(self):
+        interval = max(1.0, self.job_queue.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            patents = self.remaining()
+            if patents:
+                try:
+                    renewed = self.job_queue.renew(patents)
+                except sqlite3.Error as e:
+                    self.job_queue.logger.warning(f"续租失败: {str(e)}")
+                    continue
+                with self._lock:
+                    # 续租期间已上报结果的任务不算失去
+                    lost = (patents - renewed) & self.patents
+                    self.patents -= lost
+                    self.lost |= lost
+                if lost:
+                    self.job_queue.logger.warning(f"租约已被其他进程接管，放弃处理: {', '.join(sorted(lost))}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+class QueueSource(PatentSource):
+    """把任务队列作为引擎的专利来源：分批领取、边处理边续租，一个引擎处理到队列清空为止，
+    连接池、浏览器和数据库连接在整个工作进程中复用
+
+    引擎处理完一个专利时按事件记录的结果上报：成功、失败（未达最大尝试次数时放回队列），
+    没有结果的是已下载而被跳过的
+    """
+    name = "任务队列"
+
+    def __init__(self, job_queue, batch_size=20, poll_interval=5):
+        self.job_queue = job_queue
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.keeper = LeaseKeeper(job_queue)
+        self.outcomes = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def __iter__(self):
+        self.keeper.start()
+        while not self._stopped.is_set():
+            patents = self.job_queue.claim(self.batch_size)
+            if not patents:
+                counts = self.job_queue.counts()
+                if counts[PENDING] == 0 and counts[LEASED] == 0:
+                    return
+                # 其他进程仍持有任务，等待完成或租约过期
+                self._stopped.wait(self.poll_interval)
+                continue
+            self.keeper.add(patents)
+            for patent in patents:
+                yield patent, None
+
+    def count(self):
+        counts = self.job_queue.counts()
+        return counts[PENDING] + counts[LEASED]
+
+    def abandoned(self, patent):
+        return self.keeper.is_lost(patent)
+
+    def record(self, patent, outcome):
+        """记录引擎报告的 success / failed 事件"""
+        with self._lock:
+            self.outcomes[patent] = outcome
+
+    def done(self, patent):
+        with self._lock:
+            outcome = self.outcomes.pop(patent, None)
+        if not self.keeper.done(patent):
+            return  # 已上报过（同一专利出错后可能被再次标记为处理完毕），或租约已被其他进程接管
+        try:
+            if outcome == "success":
+                self.job_queue.complete(patent, "success")
+            elif outcome == "failed":
+                self.job_queue.fail(patent, "failed")
+            else:
+                self.job_queue.complete(patent, "skipped")
+        except sqlite3.Error as e:
+            # 未能上报的任务租约到期后会被重新领取
+            self.job_queue.logger.warning(f"上报任务结果失败 {patent}: {str(e)}")
+
+    def close(self, error=None):
+        """停止领取并结束续租；仍持有的任务在引擎出错时计为失败，被停止时归还队列"""
+        self._stopped.set()
+        self.keeper.stop()
+        remaining = self.keeper.remaining()
+        if not remaining:
+            return
+        if error is not None:
+            for patent in remaining:
+                self.job_queue.fail(patent, f"error: {error}")
+        else:
+            self.job_queue.release(remaining)
@@ -0,0 +1,72 @@
+import queue
+import logging
+import logging.handlers
+from collections import deque
+from PyQt5.QtWidgets import QPlainTextEdit
+from PyQt5.QtCore import QTimer
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+def start_file_logging(log_file, level):
+    """日志经队列交给后台线程写入文件，GUI线程和下载线程记录日志时只做入队"""
+    file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+class LogView(QPlainTextEdit):
+    """日志显示区：最近的日志保存在定长环形缓冲中，新日志先暂存，由定时器批量追加到控件末尾"""
+
+    def __init__(self, capacity=5000, flush_interval=100, parent=None):
+        super().__init__(parent)
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        # 控件本身也只保留capacity行，超出时自动丢弃最早的文本块
+        self.setMaximumBlockCount(capacity)
+        self.buffer = deque(maxlen=capacity)
+        self.dropped = 0
+        self._pending = []
+        self._timer = QTimer(self)
+        self._timer.setInterval(flush_interval)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def append_line(self, line):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(line)
+        self._pending.append(line)
+
+    def flush(self):
+        """把暂存的日志一次性追加到控件，只在停留在底部时自动滚动"""
+        if not self._pending:
+            return
+        lines = self._pending[-self.buffer.maxlen:]
+        self._pending = []
+        bar = self.verticalScrollBar()
+        at_bottom = bar.value() >= bar.maximum() - 4
+        self.appendPlainText("\n".join(lines))
+        if at_bottom:
+            bar.setValue(bar.maximum())
+
+    def clear_log(self):
+        self.buffer.clear()
+        self._pending = []
+        self.dropped = 0
+        self.clear()
+
+    def write_to(self, f):
+        """逐行写出缓冲中的日志"""
+        for line in self.buffer:
+            f.write(line)
+            f.write("\n")
+
+    def __len__(self):
+        return len(self.buffer)
@@ -3,13 +3,40 @@ import os
 import json
 import logging
 import time
+import shutil
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                           QHBoxLayout, QTextEdit, QPushButton, QLabel, 
+                           QHBoxLayout, QPushButton, QLabel, 
                            QLineEdit, QSpinBox, QFileDialog, QProgressBar,
-                           QTabWidget, QCheckBox, QMessageBox, QComboBox)
-from PyQt5.QtCore import Qt, QSettings
+                           QTabWidget, QCheckBox, QMessageBox, QComboBox,
+                           QListView, QAbstractItemView, QShortcut, QInputDialog)
+from PyQt5.QtCore import Qt, QSettings, QTimer, QThread, pyqtSignal
+from PyQt5.QtGui import QKeySequence
 from config import Config
-from downloader import PatentDownloader
+from patent_list_model import PatentListModel
+from log_view import LogView, start_file_logging
+from patent_source import PatentFileSource, is_csv
+
+SOURCE_PREVIEW_ROWS = 200  # 以文件为来源时列表中显示的专利号数量
+
+class SourceCounter(QThread):
+    """后台统计专利号文件中剩余的数量，大文件和压缩文件不阻塞界面"""
+    counted = pyqtSignal(int)
+    
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.finished.connect(self.deleteLater)
+    
+    def run(self):
+        count = 0
+        try:
+            for _ in self.source:
+                count += 1
+                if count % 10000 == 0 and self.isInterruptionRequested():
+                    return
+        except Exception:
+            count = -1
+        self.counted.emit(count)
 
 class PatentBrowser(QMainWindow):
     def __init__(self):
@@ -17,6 +44,13 @@ class PatentBrowser(QMainWindow):
         # 加载配置
         self.config = Config()
         
+        # 大文件作为待检索来源：只保存路径和偏移，列表中只显示预览
+        self.pending_source = None
+        self.source_count = None
+        self.source_count_offset = None  # source_count 是从该偏移开始统计的
+        self.source_exhausted = False
+        self.source_counter = None
+        
         # 设置日志
         self.setup_logging()
         
@@ -50,12 +84,8 @@ class PatentBrowser(QMainWindow):
         log_dir = self.config.get("download_dir", os.path.join(os.getcwd(), "downloads"))
         os.makedirs(log_dir, exist_ok=True)
         
-        logging.basicConfig(
-            level=getattr(logging, english_level),
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            filename=os.path.join(log_dir, "patent_downloader.log"),
-            filemode='a'
-        )
+        self.log_file = os.path.join(log_dir, "patent_downloader.log")
+        self.log_listener = start_file_logging(self.log_file, getattr(logging, english_level))
         self.logger = logging.getLogger("PatentBrowser")
     
     def setup_ui(self):
@@ -83,13 +113,30 @@ class PatentBrowser(QMainWindow):
         self.patent_count_label = QLabel("待检索专利号: (0个)")
         import_button = QPushButton("导入文件")
         import_button.clicked.connect(self.import_patents_from_file)
+        paste_button = QPushButton("粘贴")
+        paste_button.clicked.connect(self.paste_patents)
+        clear_button = QPushButton("清空")
+        clear_button.clicked.connect(self.clear_patents)
         import_layout.addWidget(self.patent_count_label)
         import_layout.addWidget(import_button)
+        import_layout.addWidget(paste_button)
+        import_layout.addWidget(clear_button)
         input_layout.addLayout(import_layout)
         
-        self.patent_input = QTextEdit()
-        self.patent_input.setPlaceholderText("请输入待检索的专利号，每行一个")
-        self.patent_input.textChanged.connect(self.update_patent_count)
+        # 手动输入框，回车加入待检索列表（粘贴多行同样有效）
+        self.patent_entry = QLineEdit()
+        self.patent_entry.setPlaceholderText("输入专利号后回车添加，可粘贴多行")
+        self.patent_entry.returnPressed.connect(self.add_entered_patents)
+        input_layout.addWidget(self.patent_entry)
+        
+        # 待检索专利用模型+虚拟化列表显示，只绘制可见行，增删不重排全部文本
+        self.pending_model = PatentListModel(self)
+        self.pending_model.rowsInserted.connect(self.update_patent_count)
+        self.pending_model.rowsRemoved.connect(self.update_patent_count)
+        self.pending_model.modelReset.connect(self.update_patent_count)
+        self.patent_input = self.create_patent_view(self.pending_model)
+        QShortcut(QKeySequence.Paste, self.patent_input, self.paste_patents)
+        QShortcut(QKeySequence.Delete, self.patent_input, self.remove_selected_patents)
         input_layout.addWidget(self.patent_input)
         input_group.setLayout(input_layout)
         left_layout.addWidget(input_group, 1)  # 分配更多空间给输入框
@@ -107,8 +154,11 @@ class PatentBrowser(QMainWindow):
         failed_header_layout.addWidget(export_failed_button)
         failed_layout.addLayout(failed_header_layout)
         
-        self.failed_patents = QTextEdit()
-        #self.failed_patents.setReadOnly(True)
+        self.failed_model = PatentListModel(self)
+        self.failed_model.rowsInserted.connect(self.update_failed_count)
+        self.failed_model.rowsRemoved.connect(self.update_failed_count)
+        self.failed_model.modelReset.connect(self.update_failed_count)
+        self.failed_patents = self.create_patent_view(self.failed_model)
         failed_layout.addWidget(self.failed_patents)
         failed_group.setLayout(failed_layout)
         left_layout.addWidget(failed_group, 1)  # 分配较少空间给未检索专利
@@ -135,8 +185,7 @@ class PatentBrowser(QMainWindow):
         log_layout.addLayout(log_toolbar)
         
         # 日志显示
-        self.log_display = QTextEdit()
-        #self.log_display.setReadOnly(True)
+        self.log_display = LogView(capacity=self.config.get("log_view_lines", 5000))
         log_layout.addWidget(self.log_display)
         log_tab.setLayout(log_layout)
         
@@ -160,7 +209,7 @@ class PatentBrowser(QMainWindow):
         proxy_layout = QHBoxLayout()
         self.proxy_input = QLineEdit()
         self.proxy_input.setText(self.config.get("proxy", "127.0.0.1:7890"))
-        self.proxy_input.setPlaceholderText("代理地址 (例如: 127.0.0.1:7890)")
+        self.proxy_input.setPlaceholderText("代理地址，多个用逗号分隔 (例如: 127.0.0.1:7890, 127.0.0.1:7891)")
         proxy_layout.addWidget(QLabel("代理设置:"))
         proxy_layout.addWidget(self.proxy_input)
         settings_layout.addLayout(proxy_layout)
@@ -170,7 +219,7 @@ class PatentBrowser(QMainWindow):
         self.delay_input = QSpinBox()
         self.delay_input.setRange(1, 60)
         self.delay_input.setValue(self.config.get("delay", 5))
-        delay_layout.addWidget(QLabel("检索延时(秒):"))
+        delay_layout.addWidget(QLabel("初始请求间隔(秒):"))
         delay_layout.addWidget(self.delay_input)
         settings_layout.addLayout(delay_layout)
         
@@ -192,6 +241,15 @@ class PatentBrowser(QMainWindow):
         retry_layout.addWidget(self.retry_input)
         settings_layout.addLayout(retry_layout)
         
+        # 并发浏览器数量设置
+        workers_layout = QHBoxLayout()
+        self.workers_input = QSpinBox()
+        self.workers_input.setRange(1, 16)
+        self.workers_input.setValue(self.config.get("workers", 1))
+        workers_layout.addWidget(QLabel("并发浏览器数:"))
+        workers_layout.addWidget(self.workers_input)
+        settings_layout.addLayout(workers_layout)
+        
         # 日志级别选择
         log_level_layout = QHBoxLayout()
         log_level_layout.addWidget(QLabel("日志级别:"))
@@ -206,6 +264,11 @@ class PatentBrowser(QMainWindow):
         self.resume_checkbox.setChecked(self.config.get("resume_download", True))
         settings_layout.addWidget(self.resume_checkbox)
         
+        # 精简浏览模式
+        self.lean_checkbox = QCheckBox("精简浏览模式（不加载图片、字体、媒体和第三方脚本）")
+        self.lean_checkbox.setChecked(self.config.get("lean_browsing", True))
+        settings_layout.addWidget(self.lean_checkbox)
+        
         # 保存设置按钮
         save_settings_button = QPushButton("保存设置")
         save_settings_button.clicked.connect(self.save_settings)
@@ -224,6 +287,20 @@ class PatentBrowser(QMainWindow):
         # 状态标签
         self.status_label = QLabel("浏览器状态: 未启动")
         settings_layout.addWidget(self.status_label)
+        # 状态消息可能每秒几十条，合并后只显示最新一条
+        self.pending_status = None
+        self.status_timer = QTimer(self)
+        self.status_timer.setSingleShot(True)
+        self.status_timer.setInterval(100)
+        self.status_timer.timeout.connect(self.show_pending_status)
+        
+        # 自适应请求速率
+        self.rate_label = QLabel("请求速率: -")
+        settings_layout.addWidget(self.rate_label)
+        
+        # 吞吐量和预计剩余时间
+        self.throughput_label = QLabel("吞吐量: -")
+        settings_layout.addWidget(self.throughput_label)
         
         # 开始检索按钮
         button_layout = QHBoxLayout()
@@ -257,28 +334,59 @@ class PatentBrowser(QMainWindow):
         
         main_widget.setLayout(main_layout)
     
+    def create_patent_view(self, model):
+        """创建专利号列表视图，行高统一以便按需渲染"""
+        view = QListView()
+        view.setModel(model)
+        view.setUniformItemSizes(True)
+        view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        return view
+    
     def load_state(self):
         """加载上次会话的状态"""
         settings = QSettings("PatentDownloader", "PatentBrowser")
         
+        # 加载上次的专利号文件及读取位置，文件不可用时回到普通列表
+        source_path = settings.value("patent_source", "")
+        if source_path and os.path.exists(source_path):
+            try:
+                self.set_source(PatentFileSource(
+                    source_path,
+                    settings.value("patent_source_column", "") or None,
+                    settings.value("patent_source_offset", 0, type=int),
+                ))
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"无法恢复专利号文件 {source_path}: {str(e)}")
+        
         # 加载上次输入的专利号
-        patents = settings.value("patents", "")
-        self.patent_input.setText(patents)
+        if self.pending_source is None:
+            patents = settings.value("patents", "")
+            self.pending_model.set_patents(patents.split('\n'))
         
         # 加载上次的失败专利
         failed_patents = settings.value("failed_patents", "")
-        self.failed_patents.setText(failed_patents)
-        self.update_failed_count()
+        self.failed_model.set_patents(failed_patents.split('\n'))
     
     def save_state(self):
         """保存当前会话状态"""
         settings = QSettings("PatentDownloader", "PatentBrowser")
         
-        # 保存当前输入的专利号
-        settings.setValue("patents", self.patent_input.toPlainText())
+        # 保存当前输入的专利号；以文件为来源时只保存文件路径、列和读取位置
+        if self.pending_source is not None:
+            source = self.pending_source
+            settings.setValue("patents", "")
+            settings.setValue("patent_source", source.path)
+            settings.setValue("patent_source_column", "" if source.column is None else str(source.column))
+            settings.setValue("patent_source_offset", source.offset)
+        else:
+            settings.setValue("patents", "\n".join(self.pending_model.patents()))
+            settings.remove("patent_source")
+            settings.remove("patent_source_column")
+            settings.remove("patent_source_offset")
         
         # 保存当前的失败专利
-        settings.setValue("failed_patents", self.failed_patents.toPlainText())
+        settings.setValue("failed_patents", "\n".join(self.failed_model.patents()))
     
     def save_settings(self):
         """保存设置"""
@@ -288,7 +396,9 @@ class PatentBrowser(QMainWindow):
         self.config.set("delay", self.delay_input.value())
         self.config.set("timeout", self.timeout_input.value())
         self.config.set("retry_count", self.retry_input.value())
+        self.config.set("workers", self.workers_input.value())
         self.config.set("resume_download", self.resume_checkbox.isChecked())
+        self.config.set("lean_browsing", self.lean_checkbox.isChecked())
         self.config.set("log_level", self.log_level_combo.currentText())
         
         QMessageBox.information(self, "设置保存", "设置已成功保存")
@@ -312,38 +422,108 @@ class PatentBrowser(QMainWindow):
 
     def update_patent_count(self):
         # 更新待检索专利数量
-        patents = [p for p in self.patent_input.toPlainText().strip().split('\n') if p]
-        self.patent_count_label.setText(f"待检索专利号: ({len(patents)}个)")
+        if self.pending_source is not None:
+            if self.source_count is None:
+                count = "统计中"
+            elif self.source_count < 0:
+                count = "无法统计"
+            else:
+                count = f"{self.source_count}个"
+            self.patent_count_label.setText(
+                f"待检索专利号: {self.pending_source.name} ({count}，预览前{len(self.pending_model)}个)")
+            return
+        self.patent_count_label.setText(f"待检索专利号: ({len(self.pending_model)}个)")
+
+    def set_source(self, source):
+        """以专利号文件作为待检索来源：列表只显示从读取位置开始的预览，数量在后台统计"""
+        self.pending_source = source
+        self.source_count = None
+        self.source_count_offset = source.offset
+        self.source_exhausted = False
+        self.pending_model.set_patents(source.preview(SOURCE_PREVIEW_ROWS))
+        self.set_input_enabled(not self.is_searching())
+        
+        self.stop_source_counter()
+        counter = SourceCounter(source, self)
+        counter.counted.connect(lambda count, counter=counter: self.source_counted(counter, count))
+        self.source_counter = counter
+        counter.start()
+
+    def source_counted(self, counter, count):
+        # 来源已更换时忽略旧的统计结果
+        if counter is self.source_counter:
+            self.source_count = count
+            self.source_counter = None
+            self.update_patent_count()
+
+    def stop_source_counter(self):
+        # 旧的统计线程不再需要，通知其尽快结束，结果会被忽略
+        if self.source_counter is not None:
+            self.source_counter.requestInterruption()
+            self.source_counter = None
+
+    def clear_source(self):
+        self.stop_source_counter()
+        self.pending_source = None
+        self.source_count = None
+        self.source_exhausted = False
+        self.set_input_enabled(not self.is_searching())
+
+    def update_source_offset(self, offset, exhausted):
+        """记录文件中已处理到的位置，停止或关闭后从这里继续"""
+        if self.pending_source is not None:
+            self.pending_source.offset = offset
+            self.source_exhausted = exhausted
 
     def update_failed_count(self):
         # 更新未检索到的专利数量
-        failed = [p for p in self.failed_patents.toPlainText().strip().split('\n') if p]
-        self.failed_count_label.setText(f"未检索到的专利号: ({len(failed)}个)")
+        self.failed_count_label.setText(f"未检索到的专利号: ({len(self.failed_model)}个)")
+
+    def add_patent_lines(self, text):
+        """把多行文本加入待检索列表，返回新增数量"""
+        added = self.pending_model.add_patents(text.splitlines())
+        if added:
+            self.patent_input.scrollToBottom()
+        return added
+
+    def add_entered_patents(self):
+        if self.add_patent_lines(self.patent_entry.text()) or self.patent_entry.text().strip():
+            self.patent_entry.clear()
+
+    def paste_patents(self):
+        """粘贴剪贴板中的专利号，每行一个"""
+        if self.pending_source is not None:
+            self.status_label.setText("已导入专利号文件，清空后才能粘贴")
+        elif not self.is_searching():
+            self.add_patent_lines(QApplication.clipboard().text())
+
+    def clear_patents(self):
+        if not self.is_searching():
+            self.clear_source()
+            self.pending_model.clear()
+
+    def remove_selected_patents(self):
+        """删除待检索列表中选中的专利号"""
+        if not self.is_searching() and self.pending_source is None:
+            rows = [index.row() for index in self.patent_input.selectionModel().selectedRows()]
+            self.pending_model.remove_rows(rows)
+
+    def is_searching(self):
+        browser_thread = getattr(self, "browser_thread", None)
+        return browser_thread is not None and browser_thread.isRunning()
 
     def add_log_entry(self, patent, filename, strategy_num):
         # 添加日志记录
         current_time = time.strftime("%Y-%m-%d %H:%M:%S")
         log_entry = f"[{current_time}] 专利号: {patent} | 文件名: {filename} | 策略{strategy_num}成功"
-        current_text = self.log_display.toPlainText()
-        if current_text:
-            self.log_display.setText(f"{current_text}\n{log_entry}")
-        else:
-            self.log_display.setText(log_entry)
-        # 滚动到底部
-        self.log_display.verticalScrollBar().setValue(
-            self.log_display.verticalScrollBar().maximum()
-        )
+        # 先进入缓冲，由定时器批量刷新到界面
+        self.log_display.append_line(log_entry)
         
-        # 同时写入日志文件
-        self.logger.info(f"专利号: {patent} | 文件名: {filename} | 策略{strategy_num}成功")  # 修复了缺少的右括号
+        # 同时写入日志文件（经队列由后台线程写入）
+        self.logger.info(f"专利号: {patent} | 文件名: {filename} | 策略{strategy_num}成功")
 
     def add_failed_patent(self, patent):
-        current_text = self.failed_patents.toPlainText()
-        if current_text:
-            self.failed_patents.setText(f"{current_text}\n{patent}")
-        else:
-            self.failed_patents.setText(patent)
-        self.update_failed_count()
+        self.failed_model.add_patents([patent])
         
         # 记录到日志
         self.logger.warning(f"未找到专利: {patent}")
@@ -356,10 +536,18 @@ class PatentBrowser(QMainWindow):
 
     def start_search(self):
         if self.start_button.text() == "开始检索":
-            patents = self.patent_input.toPlainText().strip().split('\n')
-            if not patents or not patents[0]:
-                self.status_label.setText("请输入专利号")
-                return
+            if self.pending_source is not None:
+                # 从上次处理到的位置继续读取文件；界面已统计完从该位置开始的数量时直接交给引擎
+                total = None
+                if self.source_count is not None and self.source_count >= 0 \
+                        and self.pending_source.offset == self.source_count_offset:
+                    total = self.source_count
+                patents = self.pending_source.at_offset(self.pending_source.offset, total)
+            else:
+                patents = self.pending_model.patents()
+                if not patents:
+                    self.status_label.setText("请输入专利号")
+                    return
             
             # 更新配置
             self.config.set("download_dir", self.download_dir_input.text())
@@ -367,17 +555,20 @@ class PatentBrowser(QMainWindow):
             self.config.set("delay", self.delay_input.value())
             self.config.set("timeout", self.timeout_input.value())
             self.config.set("retry_count", self.retry_input.value())
+            self.config.set("workers", self.workers_input.value())
             self.config.set("resume_download", self.resume_checkbox.isChecked())
+            self.config.set("lean_browsing", self.lean_checkbox.isChecked())
             
             self.start_button.setText("停止检索")
             self.resume_button.setEnabled(False)
-            self.patent_input.setReadOnly(True)
+            self.set_input_enabled(False)
             self.progress_bar.setValue(0)
-            self.failed_patents.clear()  # 清空未检索到的专利号
-            
-            # 保存原始专利列表，用于后续移除
-            self.original_patents = patents.copy()
+            # 清空未检索到的专利号；文件来源可能分多次处理完，失败的专利累积保留
+            if self.pending_source is None:
+                self.failed_model.clear()
             
+            # 下载引擎及selenium、requests等依赖到开始检索时才加载，加快窗口启动
+            from downloader import PatentDownloader
             self.browser_thread = PatentDownloader(patents, self.config)
             self.browser_thread.status_update.connect(self.update_status)
             self.browser_thread.failed_patent.connect(self.add_failed_patent)
@@ -385,6 +576,9 @@ class PatentBrowser(QMainWindow):
             self.browser_thread.finished.connect(self.search_finished)
             self.browser_thread.log_entry.connect(self.add_log_entry)
             self.browser_thread.success_patent.connect(self.remove_success_patent)  # 连接新信号
+            self.browser_thread.rate_update.connect(self.update_rate)
+            self.browser_thread.metrics_update.connect(self.update_throughput)
+            self.browser_thread.source_update.connect(self.update_source_offset)
             self.browser_thread.start()
         else:
             if self.browser_thread:
@@ -393,72 +587,136 @@ class PatentBrowser(QMainWindow):
     # 添加新方法，用于移除成功下载的专利号
     def remove_success_patent(self, patent):
         """从待检索区移除成功下载的专利号"""
-        current_patents = self.patent_input.toPlainText().strip().split('\n')
-        if patent in current_patents:
-            current_patents.remove(patent)
-            self.patent_input.setText('\n'.join(current_patents))
-            self.update_patent_count()
+        # 列表中保存的就是规范化后的专利号，按哈希索引直接定位删除
+        if self.pending_model.remove_patent(patent):
             self.logger.info(f"已从待检索区移除专利: {patent}")
     def resume_search(self):
         """继续检索失败的专利"""
-        failed_patents = [p for p in self.failed_patents.toPlainText().strip().split('\n') if p]
+        if self.pending_source is not None and not self.source_exhausted:
+            # 文件还没处理完时先继续处理文件，失败的专利留到最后
+            self.status_label.setText(f"继续处理文件: {self.pending_source.name}")
+            self.start_search()
+            return
+        
+        failed_patents = self.failed_model.patents()
         if not failed_patents:
             self.status_label.setText("没有失败的专利需要重新检索")
             return
         
         # 将失败的专利设置为待检索专利
-        self.patent_input.setText("\n".join(failed_patents))
-        self.failed_patents.clear()
-        self.update_failed_count()
+        self.clear_source()
+        self.pending_model.set_patents(failed_patents)
+        self.failed_model.clear()
         
         # 开始检索
         self.start_search()
 
+    def set_input_enabled(self, enabled):
+        """检索进行中禁止修改待检索列表；以文件为来源时只能清空，不能手动添加"""
+        self.patent_entry.setEnabled(enabled and self.pending_source is None)
+
     def update_status(self, status):
-        self.status_label.setText(status)
+        self.pending_status = status
+        if not self.status_timer.isActive():
+            self.status_timer.start()
         self.logger.info(status)
 
+    def show_pending_status(self):
+        if self.pending_status is not None:
+            self.status_label.setText(self.pending_status)
+            self.pending_status = None
+
+    def update_rate(self, summary):
+        self.rate_label.setText(f"请求速率: {summary}")
+
+    def update_throughput(self, throughput):
+        eta = throughput.get("eta_seconds")
+        eta_text = time.strftime("%H:%M:%S", time.gmtime(eta)) if eta is not None else "-"
+        self.throughput_label.setText(
+            f"吞吐量: {throughput['files_per_min']:.1f} 个/分钟, {throughput['mb_per_s']:.2f} MB/s, "
+            f"已处理 {throughput['processed']}/{throughput['total']}, 预计剩余 {eta_text}"
+        )
+
     def update_progress(self, progress):
         self.progress_bar.setValue(progress)
 
     def search_finished(self):
         self.start_button.setText("开始检索")
-        self.patent_input.setReadOnly(False)
+        self.set_input_enabled(True)
+        self.status_timer.stop()
+        self.pending_status = None
         self.status_label.setText("检索已完成")
         
         # 如果有失败的专利，启用继续检索按钮
-        failed_patents = self.failed_patents.toPlainText().strip()
-        self.resume_button.setEnabled(bool(failed_patents))
+        self.resume_button.setEnabled(len(self.failed_model) > 0)
+        
+        # 文件来源刷新为从新位置开始的预览和剩余数量
+        if self.pending_source is not None:
+            exhausted = self.source_exhausted
+            self.set_source(self.pending_source.at_offset(self.pending_source.offset))
+            self.source_exhausted = exhausted
         
         # 保存当前状态
         self.save_state()
 
     def import_patents_from_file(self):
-        """从文件导入专利号"""
+        """从文件导入专利号：小文本文件加入列表，大文件、CSV和压缩文件作为逐行读取的来源"""
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "选择专利号文件", "", "文本文件 (*.txt);;所有文件 (*.*)"
+            self, "选择专利号文件", "",
+            "专利号文件 (*.txt *.csv *.gz);;文本文件 (*.txt);;CSV文件 (*.csv);;所有文件 (*.*)"
         )
         if file_path:
             try:
+                if self.should_stream(file_path):
+                    self.import_source(file_path)
+                    return
                 with open(file_path, 'r', encoding='utf-8') as f:
-                    patents = f.read().strip()
-                
-                current_patents = self.patent_input.toPlainText().strip()
-                if current_patents:
-                    self.patent_input.setText(f"{current_patents}\n{patents}")
-                else:
-                    self.patent_input.setText(patents)
+                    added = self.pending_model.add_patents(f)
                 
                 self.logger.info(f"从文件导入专利号: {file_path}")
-                QMessageBox.information(self, "导入成功", f"成功从文件导入专利号")
+                QMessageBox.information(self, "导入成功", f"成功从文件导入{added}个专利号")
             except Exception as e:
                 error_msg = f"导入文件失败: {str(e)}"
                 self.logger.error(error_msg)
                 QMessageBox.critical(self, "导入失败", error_msg)
 
+    def should_stream(self, file_path):
+        """CSV、gzip和超过配置大小的文件不整体读入列表"""
+        if self.pending_source is not None or is_csv(file_path) or file_path.lower().endswith(".gz"):
+            return True
+        return os.path.getsize(file_path) > self.config.get("stream_import_mb", 5) * 1024 * 1024
+
+    def import_source(self, file_path):
+        """把文件设为待检索来源，CSV先选择专利号所在的列"""
+        column = None
+        if is_csv(file_path):
+            columns = PatentFileSource.sniff_columns(file_path)
+            if columns:
+                lowered = [name.lower() for name in columns]
+                default = lowered.index("id") if "id" in lowered else 0
+                column, ok = QInputDialog.getItem(self, "选择专利号列", "CSV文件中专利号所在的列:",
+                                                  columns, default, False)
+                if not ok:
+                    return
+        
+        if len(self.pending_model) and self.pending_source is None:
+            reply = QMessageBox.question(
+                self, '导入文件',
+                "导入的文件将替换当前待检索列表，是否继续？",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return
+        
+        self.set_source(PatentFileSource(file_path, column))
+        self.logger.info(f"导入专利号文件: {file_path}")
+        QMessageBox.information(self, "导入成功",
+                                f"已导入文件 {os.path.basename(file_path)}，检索时逐行读取，列表中仅显示预览")
+
     def export_failed_patents(self):
         """导出失败的专利号到文件"""
-        failed_patents = self.failed_patents.toPlainText().strip()
+        failed_patents = self.failed_model.patents()
         if not failed_patents:
             QMessageBox.information(self, "导出失败专利", "没有失败的专利需要导出")
             return
@@ -469,7 +727,7 @@ class PatentBrowser(QMainWindow):
         if file_path:
             try:
                 with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(failed_patents)
+                    f.write("\n".join(failed_patents))
                 
                 self.logger.info(f"导出失败专利号到文件: {file_path}")
                 QMessageBox.information(self, "导出成功", f"成功导出失败专利号到文件")
@@ -480,22 +738,40 @@ class PatentBrowser(QMainWindow):
 
     def clear_log(self):
         """清除日志显示"""
-        self.log_display.clear()
+        self.log_display.clear_log()
 
     def export_log(self):
         """导出日志到文件"""
-        log_text = self.log_display.toPlainText().strip()
-        if not log_text:
+        if not len(self.log_display):
             QMessageBox.information(self, "导出日志", "没有日志需要导出")
             return
         
+        # 日志区只保留最近的记录，较早的已被丢弃时可改为导出完整的日志文件
+        full_log = False
+        if self.log_display.dropped and os.path.exists(self.log_file):
+            reply = QMessageBox.question(
+                self, '导出日志',
+                f"日志区只保留最近{len(self.log_display)}条记录，是否导出完整的日志文件？",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.Yes
+            )
+            full_log = reply == QMessageBox.Yes
+        
         file_path, _ = QFileDialog.getSaveFileName(
             self, "保存日志", "", "文本文件 (*.txt);;所有文件 (*.*)"
         )
         if file_path:
             try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(log_text)
+                if full_log:
+                    # 先让后台线程把队列中的日志写完，再分块复制，不整体读入内存
+                    self.log_listener.stop()
+                    try:
+                        shutil.copyfile(self.log_file, file_path)
+                    finally:
+                        self.log_listener.start()
+                else:
+                    with open(file_path, 'w', encoding='utf-8') as f:
+                        self.log_display.write_to(f)
                 
                 self.logger.info(f"导出日志到文件: {file_path}")
                 QMessageBox.information(self, "导出成功", f"成功导出日志到文件")
@@ -526,7 +802,13 @@ class PatentBrowser(QMainWindow):
         # 保存当前状态
         self.save_state()
         
-        # 确保日志正确关闭
+        # 等待后台统计线程结束
+        for counter in self.findChildren(SourceCounter):
+            counter.requestInterruption()
+            counter.wait()
+        
+        # 确保日志正确关闭：先写完队列中剩余的日志
+        self.log_listener.stop()
         logging.shutdown()
         
         event.accept()
\ No newline at end of file
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+QUANTILES = (("p50", "0.5"), ("p95", "0.95"), ("p99", "0.99"))
+
+
+class StageStats:
+    """单个阶段的次数、总耗时和最近样本，样本用于估算分位数"""
+
+    def __init__(self, window=2048):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=window)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.samples.append(seconds)
+
+    def percentile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "total": round(self.total, 3),
+            "mean": round(self.total / self.count, 3) if self.count else 0.0,
+            "p50": round(self.percentile(0.5), 3),
+            "p95": round(self.percentile(0.95), 3),
+            "p99": round(self.percentile(0.99), 3),
+        }
+
+
+class Metrics:
+    """运行指标：各阶段耗时、字节数、各策略成败计数和吞吐量，定期写出快照文件
+
+    快照文件扩展名为 .prom 时写Prometheus文本格式，否则写JSON；
+    每个专利各阶段的耗时明细可逐行追加到 patent_log（JSONL）
+    """
+
+    def __init__(self, snapshot_file=None, total=0, interval=2.0, patent_log=None):
+        self.snapshot_file = snapshot_file
+        self.patent_log = patent_log
+        self.total = total
+        self.interval = interval
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.strategies = {}  # 策略号 -> [成功次数, 失败次数]
+        self.bytes = 0
+        self.files = 0
+        self.processed = 0
+        self._patents = {}  # 专利号 -> {阶段: 耗时}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._last_write = 0
+
+    def bind(self, patent):
+        """当前线程接下来的计时归到该专利名下"""
+        self._local.patent = patent
+        if patent is not None:
+            with self._lock:
+                self._patents.setdefault(patent, {"start": time.time()})
+
+    @contextmanager
+    def timer(self, stage, patent=None):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.time() - start, patent)
+
+    def observe(self, stage, seconds, patent=None):
+        patent = patent or getattr(self._local, "patent", None)
+        with self._lock:
+            self.stages.setdefault(stage, StageStats()).add(seconds)
+            breakdown = self._patents.get(patent)
+            if breakdown is not None:
+                breakdown[stage] = breakdown.get(stage, 0.0) + seconds
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def add_bytes(self, n):
+        with self._lock:
+            self.bytes += n
+
+    def strategy_result(self, strategy, success):
+        with self._lock:
+            result = self.strategies.setdefault(str(strategy), [0, 0])
+            result[0 if success else 1] += 1
+
+    def mark_processed(self, patent=None):
+        """累加已处理数量；跳过、被停止等没有结果的专利不写明细，同时丢弃其计时记录"""
+        with self._lock:
+            self.processed += 1
+            if patent is not None:
+                self._patents.pop(patent, None)
+
+    def finish_patent(self, patent, success):
+        """专利处理结束：汇总总耗时，并把明细写入JSONL"""
+        with self._lock:
+            breakdown = self._patents.pop(patent, None)
+            if success:
+                self.files += 1
+        if breakdown is None:
+            return
+        elapsed = time.time() - breakdown.pop("start")
+        self.observe("patent", elapsed, patent=None)
+        if self.patent_log:
+            record = {"patent": patent, "success": success, "elapsed": round(elapsed, 3)}
+            record.update({stage: round(seconds, 3) for stage, seconds in breakdown.items()})
+            with self._lock:
+                with open(self.patent_log, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def throughput(self):
+        """每分钟完成文件数、下载速度(MB/s)和按当前处理速度估算的剩余时间(秒)"""
+        elapsed = max(1e-6, time.time() - self.started)
+        with self._lock:
+            files, processed, size = self.files, self.processed, self.bytes
+        eta = None
+        if processed and self.total:
+            eta = max(0.0, (self.total - processed) * elapsed / processed)
+        return {
+            "files_per_min": round(files * 60 / elapsed, 2),
+            "mb_per_s": round(size / elapsed / 1024 / 1024, 3),
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "processed": processed,
+            "total": self.total,
+        }
+
+    def snapshot(self):
+        throughput = self.throughput()
+        with self._lock:
+            return {
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "elapsed": round(time.time() - self.started, 3),
+                "files": self.files,
+                "bytes": self.bytes,
+                "throughput": throughput,
+                "stages": {stage: stats.summary() for stage, stats in self.stages.items()},
+                "counters": dict(self.counters),
+                "strategies": {k: {"success": v[0], "failure": v[1]} for k, v in self.strategies.items()},
+            }
+
+    def prometheus(self, snapshot=None):
+        """Prometheus文本格式"""
+        snapshot = snapshot or self.snapshot()
+        lines = [
+            f"patent_files_total {snapshot['files']}",
+            f"patent_bytes_total {snapshot['bytes']}",
+            f"patent_processed_total {snapshot['throughput']['processed']}",
+            f"patent_batch_size {snapshot['throughput']['total']}",
+            f"patent_files_per_minute {snapshot['throughput']['files_per_min']}",
+            f"patent_download_mb_per_second {snapshot['throughput']['mb_per_s']}",
+        ]
+        if snapshot['throughput']['eta_seconds'] is not None:
+            lines.append(f"patent_eta_seconds {snapshot['throughput']['eta_seconds']}")
+        for stage, stats in snapshot["stages"].items():
+            for key, quantile in QUANTILES:
+                lines.append(f'patent_stage_seconds{{stage="{stage}",quantile="{quantile}"}} {stats[key]}')
+            lines.append(f'patent_stage_seconds_sum{{stage="{stage}"}} {stats["total"]}')
+            lines.append(f'patent_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        for name, value in snapshot["counters"].items():
+            lines.append(f'patent_events_total{{event="{name}"}} {value}')
+        for strategy, result in snapshot["strategies"].items():
+            for outcome, value in result.items():
+                lines.append(f'patent_strategy_total{{strategy="{strategy}",outcome="{outcome}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, force=False):
+        """写出快照文件，未强制时按间隔限频；返回本次是否写出"""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._last_write < self.interval:
+                return False
+            self._last_write = now
+        if self.snapshot_file:
+            snapshot = self.snapshot()
+            if self.snapshot_file.endswith(".prom"):
+                content = self.prometheus(snapshot)
+            else:
+                content = json.dumps(snapshot, ensure_ascii=False, indent=4)
+            temp = f"{self.snapshot_file}.tmp"
+            with open(temp, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(temp, self.snapshot_file)
+        return True
@@ -0,0 +1,64 @@
+FOUND = "found"
+EMPTY = "empty"
+TIMEOUT = "timeout"
+
+# 在页面内用MutationObserver监听DOM变化，候选链接或“无结果”标记一出现立即返回，不做固定等待
+WAIT_FOR_ANY_SCRIPT = """
+var linkSelectors = arguments[0];
+var emptySelectors = arguments[1];
+var emptyTexts = arguments[2];
+var timeoutMs = arguments[3];
+var done = arguments[arguments.length - 1];
+var finished = false;
+
+function linkOf(element) {
+    var anchor = element.closest("a") || element.parentElement;
+    return element.href || (anchor && anchor.href) || null;
+}
+
+function check() {
+    for (var i = 0; i < linkSelectors.length; i++) {
+        var elements = document.querySelectorAll(linkSelectors[i]);
+        for (var j = 0; j < elements.length; j++) {
+            if (linkOf(elements[j])) return "found";
+        }
+    }
+    for (var k = 0; k < emptySelectors.length; k++) {
+        if (document.querySelector(emptySelectors[k])) return "empty";
+    }
+    if (emptyTexts.length && document.body) {
+        var text = document.body.innerText || "";
+        for (var m = 0; m < emptyTexts.length; m++) {
+            if (text.indexOf(emptyTexts[m]) !== -1) return "empty";
+        }
+    }
+    return null;
+}
+
+function finish(result) {
+    if (finished) return;
+    finished = true;
+    observer.disconnect();
+    clearTimeout(timer);
+    done(result);
+}
+
+var observer = new MutationObserver(function() {
+    var result = check();
+    if (result) finish(result);
+});
+var timer = setTimeout(function() { finish("timeout"); }, timeoutMs);
+observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, attributeFilter: ["href"]});
+
+var initial = check();
+if (initial) finish(initial);
+"""
+
+
+def wait_for_any(driver, link_selectors, empty_selectors=(), empty_texts=(), timeout=10):
+    """等待任一候选PDF链接或“无结果”标记出现，返回 FOUND / EMPTY / TIMEOUT"""
+    driver.set_script_timeout(timeout + 5)
+    return driver.execute_async_script(
+        WAIT_FOR_ANY_SCRIPT, list(link_selectors), list(empty_selectors),
+        list(empty_texts), int(timeout * 1000)
+    ) or TIMEOUT
@@ -0,0 +1,70 @@
+import re
+
+# 国家/组织代码 + 号码 + 可选类型码，如 CN112345678A、US20190123456A1、EP1234567B1
+PATENT_ID_PATTERN = re.compile(r'^([A-Z]{2})(\d+)([A-Z]\d?)?$')
+SEPARATOR_PATTERN = re.compile(r'[\s,\-_/.]+')
+ALNUM_PATTERN = re.compile(r'^[A-Z0-9]+$')
+
+
+def normalize_patent_id(raw):
+    """规范化专利号：统一大写，去掉空白、逗号、连字符、斜杠和点，如 US 2019/0123456 A1 -> US20190123456A1
+
+    能拆分为国家码/号码/类型码时由拆分结果重组；规范号会用作文件名，
+    空行和去掉分隔符后仍含字母数字以外字符的输入返回None
+    """
+    compact = SEPARATOR_PATTERN.sub("", (raw or "").strip().upper())
+    parts = split_patent_id(compact)
+    if parts:
+        return "".join(parts)
+    return compact if ALNUM_PATTERN.match(compact) else None
+
+
+def split_patent_id(patent_id):
+    """拆分规范化后的专利号为 (国家码, 号码, 类型码)，无法识别时返回None"""
+    match = PATENT_ID_PATTERN.match(patent_id or "")
+    if not match:
+        return None
+    return match.group(1), match.group(2), match.group(3) or ""
+
+
+class PatentIndex:
+    """输入专利号的规范化索引：用哈希表去重，并记录每个规范号来自哪些原始输入行"""
+
+    def __init__(self, lines=()):
+        self.patents = []  # 去重后的规范号，保持首次出现的顺序
+        self.sources = {}  # 规范号 -> [原始输入行]
+        self.blank = 0
+        self.invalid = 0  # 含无法用作文件名的字符
+        self.duplicates = 0
+        self.extend(lines)
+
+    def add(self, raw):
+        """加入一行输入，返回规范号；空行和无效行返回None"""
+        canonical = normalize_patent_id(raw)
+        if canonical is None:
+            if (raw or "").strip():
+                self.invalid += 1
+            else:
+                self.blank += 1
+            return None
+        if canonical in self.sources:
+            self.duplicates += 1
+            self.sources[canonical].append(raw)
+        else:
+            self.sources[canonical] = [raw]
+            self.patents.append(canonical)
+        return canonical
+
+    def extend(self, lines):
+        for raw in lines:
+            self.add(raw)
+
+    def originals(self, canonical):
+        """规范号对应的全部原始输入行"""
+        return self.sources.get(canonical, [])
+
+    def __contains__(self, canonical):
+        return canonical in self.sources
+
+    def __len__(self):
+        return len(self.patents)
@@ -0,0 +1,162 @@
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from patent_ids import normalize_patent_id
+
+
+class IndexedList:
+    """带哈希索引的有序列表：按值查找O(1)，删除只打墓碑标记，
+    行号与存储位置之间用树状数组换算（O(log n)），墓碑过半时整体压缩"""
+
+    def __init__(self, items=()):
+        self.reset(items)
+
+    def reset(self, items=()):
+        self._items = []
+        self._position = {}
+        for item in items:
+            if item not in self._position:
+                self._position[item] = len(self._items)
+                self._items.append(item)
+        self._live = len(self._items)
+        self._build_tree()
+
+    def _build_tree(self):
+        # 树状数组，下标从1开始，每个存活元素计1
+        size = len(self._items)
+        self._tree = [0] * (size + 1)
+        for i in range(1, size + 1):
+            self._tree[i] += 1 if self._items[i - 1] is not None else 0
+            parent = i + (i & -i)
+            if parent <= size:
+                self._tree[parent] += self._tree[i]
+
+    def _prefix(self, i):
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _update(self, i, delta):
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def __len__(self):
+        return self._live
+
+    def __contains__(self, item):
+        return item in self._position
+
+    def __iter__(self):
+        return (item for item in self._items if item is not None)
+
+    def append(self, item):
+        """追加元素，已存在时返回False"""
+        if item in self._position:
+            return False
+        self._items.append(item)
+        self._position[item] = len(self._items) - 1
+        # 新节点覆盖 (i - lowbit(i), i] 区间
+        i = len(self._items)
+        self._tree.append(1 + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+        self._live += 1
+        return True
+
+    def row_of(self, item):
+        position = self._position.get(item)
+        if position is None:
+            return -1
+        return self._prefix(position + 1) - 1
+
+    def item_at(self, row):
+        """第row个存活元素（从0开始）"""
+        if row < 0 or row >= self._live:
+            return None
+        position = 0
+        remaining = row + 1
+        step = 1 << (len(self._tree).bit_length())
+        while step:
+            nxt = position + step
+            if nxt < len(self._tree) and self._tree[nxt] < remaining:
+                position = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        return self._items[position]
+
+    def remove(self, item):
+        """删除元素并返回其原行号，不存在时返回-1"""
+        position = self._position.pop(item, None)
+        if position is None:
+            return -1
+        row = self._prefix(position + 1) - 1
+        self._items[position] = None
+        self._update(position + 1, -1)
+        self._live -= 1
+        if len(self._items) > 64 and self._live < len(self._items) // 2:
+            self.reset(list(self))
+        return row
+
+
+class PatentListModel(QAbstractListModel):
+    """专利号列表模型，供虚拟化的QListView显示；新增时规范化去重，按专利号删除无需遍历"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._patents = IndexedList()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._patents)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+            return None
+        return self._patents.item_at(index.row())
+
+    def patents(self):
+        return list(self._patents)
+
+    def __len__(self):
+        return len(self._patents)
+
+    def __contains__(self, patent):
+        return patent in self._patents
+
+    def set_patents(self, lines):
+        self.beginResetModel()
+        self._patents.reset(p for p in map(normalize_patent_id, lines) if p)
+        self.endResetModel()
+
+    def add_patents(self, lines):
+        """批量追加（粘贴、导入），返回新增数量"""
+        new = []
+        seen = set()
+        for canonical in map(normalize_patent_id, lines):
+            if canonical and canonical not in self._patents and canonical not in seen:
+                seen.add(canonical)
+                new.append(canonical)
+        if not new:
+            return 0
+        first = len(self._patents)
+        self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+        for canonical in new:
+            self._patents.append(canonical)
+        self.endInsertRows()
+        return len(new)
+
+    def remove_patent(self, patent):
+        row = self._patents.row_of(patent)
+        if row < 0:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._patents.remove(patent)
+        self.endRemoveRows()
+        return True
+
+    def remove_rows(self, rows):
+        """删除选中的若干行"""
+        for patent in [self._patents.item_at(row) for row in sorted(set(rows))]:
+            if patent is not None:
+                self.remove_patent(patent)
+
+    def clear(self):
+        self.set_patents([])
@@ -0,0 +1,215 @@
+import os
+import csv
+import gzip
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from patent_ids import normalize_patent_id, split_patent_id
+
+GZIP_MAGIC = b"\x1f\x8b"
+HEADER_SCAN_LINES = 20  # 在前几行中查找CSV表头（Google Patents导出的CSV第一行是检索地址）
+
+
+def is_gzip(path):
+    with open(path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def is_csv(path):
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    return name.endswith(".csv")
+
+
+def parse_csv_line(text):
+    try:
+        return next(csv.reader([text]))
+    except (csv.Error, StopIteration):
+        return []
+
+
+def looks_like_patent(value):
+    return split_patent_id(normalize_patent_id(value)) is not None
+
+
+class PatentSource(ABC):
+    """引擎的惰性专利来源：迭代产出 (原始专利号, 偏移)，偏移为None的来源不支持续读
+
+    实现有专利号文件（PatentFileSource）和共享任务队列（job_queue.QueueSource）
+    """
+    name = ""
+    offset = None
+    end_offset = None
+    total = None  # 已知的剩余数量（如界面已统计过），None时引擎在后台调用count统计
+
+    @abstractmethod
+    def __iter__(self):
+        """逐个产出 (原始专利号, 偏移)"""
+
+    @abstractmethod
+    def count(self):
+        """剩余专利数量，用于进度和剩余时间"""
+
+    def done(self, patent):
+        """专利处理完毕（成功、失败或跳过）时由引擎调用"""
+
+    def abandoned(self, patent):
+        """来源已不再要求处理该专利（如任务租约被其他进程接管），引擎应尽快放弃"""
+        return False
+
+
+class PatentFileSource(PatentSource):
+    """从TXT、CSV（指定列）或gzip压缩文件逐行惰性读取专利号，不把整个文件读入内存
+
+    偏移是（解压后）内容中的字节位置，从记录的偏移处重新打开即可接着读；
+    CSV按行解析，不支持单元格内换行，不是专利号格式的单元格（表头、说明行）被跳过
+    """
+
+    def __init__(self, path, column=None, offset=0, total=None):
+        self.path = path
+        self.total = total
+        # CSV列名或从0开始的列号；None时TXT每行一个，CSV取第一列
+        self.column = int(column) if isinstance(column, str) and column.isdigit() else column
+        self.offset = offset
+        self.compressed = is_gzip(path)
+        self.csv = is_csv(path) or self.column is not None
+        self.column_index, self.data_start = self._locate_column()
+        self.end_offset = None  # 读完后为文件末尾的偏移
+
+    def at_offset(self, offset, total=None):
+        """同一文件从指定偏移开始的新读取器，total为已知的剩余数量"""
+        return PatentFileSource(self.path, self.column, offset, total)
+
+    def open(self):
+        return gzip.open(self.path, 'rb') if self.compressed else open(self.path, 'rb')
+
+    def _locate_column(self):
+        """返回 (CSV列号, 数据起始偏移)；按列名查找时数据从表头的下一行开始"""
+        if not self.csv:
+            return None, 0
+        if self.column is None:
+            return 0, 0
+        if isinstance(self.column, int):
+            return self.column, 0
+        wanted = self.column.strip().lower()
+        offset = 0
+        with self.open() as f:
+            for _ in range(HEADER_SCAN_LINES):
+                line = f.readline()
+                if not line:
+                    break
+                offset += len(line)
+                cells = [cell.strip().lower() for cell in parse_csv_line(line.decode('utf-8-sig', errors='replace'))]
+                if wanted in cells:
+                    return cells.index(wanted), offset
+        raise ValueError(f"CSV文件中找不到列: {self.column}")
+
+    def parse(self, line):
+        """从一行中取出专利号，空行和无效行返回None"""
+        text = line.decode('utf-8-sig', errors='replace').strip()
+        if not text or self.column_index is None:
+            return text or None
+        row = parse_csv_line(text)
+        if self.column_index >= len(row):
+            return None
+        value = row[self.column_index].strip()
+        return value if looks_like_patent(value) else None
+
+    def __iter__(self):
+        """逐个产出 (原始专利号, 该行结束处的偏移)"""
+        start = max(self.offset, self.data_start)
+        with self.open() as f:
+            if start:
+                f.seek(start)
+            offset = start
+            for line in f:
+                offset += len(line)
+                raw = self.parse(line)
+                if raw:
+                    yield raw, offset
+            self.end_offset = offset
+
+    def ids(self):
+        for raw, _ in self:
+            yield raw
+
+    def preview(self, limit=200):
+        """从当前偏移开始的前limit个专利号"""
+        rows = []
+        for raw in self.ids():
+            rows.append(raw)
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def count(self):
+        """从当前偏移到文件末尾的专利号数量，需要读完整个文件"""
+        return sum(1 for _ in self)
+
+    @staticmethod
+    def sniff_columns(path):
+        """CSV表头候选：第一条含专利号的数据行之前、最后一个有多列且不含专利号的行"""
+        header = []
+        opener = gzip.open if is_gzip(path) else open
+        with opener(path, 'rb') as f:
+            for _ in range(HEADER_SCAN_LINES):
+                line = f.readline()
+                if not line:
+                    break
+                cells = [cell.strip() for cell in parse_csv_line(line.decode('utf-8-sig', errors='replace'))]
+                if any(looks_like_patent(cell) for cell in cells):
+                    break
+                if len([cell for cell in cells if cell]) > 1:
+                    header = cells
+        return header
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+
+class OffsetTracker:
+    """多线程乱序处理时按读入顺序推进可续读的偏移：之前读入的专利都处理完，偏移才前进"""
+
+    def __init__(self, offset=0):
+        self.offset = offset
+        self.closed = False  # 文件已读完
+        self._pending = deque()  # [专利号, 行结束偏移, 是否已处理]
+        self._lock = threading.Lock()
+
+    def issue(self, patent, offset):
+        with self._lock:
+            self._pending.append([patent, offset, False])
+
+    def done(self, patent):
+        """标记最早读入的一个同号专利已处理，返回当前可续读的偏移"""
+        with self._lock:
+            for entry in self._pending:
+                if entry[0] == patent and not entry[2]:
+                    entry[2] = True
+                    break
+            while self._pending and self._pending[0][2]:
+                self.offset = self._pending.popleft()[1]
+            return self.offset
+
+    def skip(self, offset):
+        """跳过的行（如重复的专利号）视为已处理，之前读入的专利都处理完后偏移越过该行"""
+        with self._lock:
+            self._pending.append([None, offset, True])
+            while self._pending and self._pending[0][2]:
+                self.offset = self._pending.popleft()[1]
+
+    def close(self, offset=None):
+        """文件读完；offset为文件末尾，末尾的空行和无效行也算已读"""
+        with self._lock:
+            self.closed = True
+            if offset is not None:
+                self._pending.append([None, offset, True])
+                while self._pending and self._pending[0][2]:
+                    self.offset = self._pending.popleft()[1]
+
+    @property
+    def exhausted(self):
+        with self._lock:
+            return self.closed and not self._pending
@@ -0,0 +1,494 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from rate_limiter import RateLimited
+from proxy_pool import requests_proxies
+
+CONTENT_RANGE_PATTERN = re.compile(r'bytes\s+(\d+)-\d+/(\d+|\*)')
+
+
+def parse_content_range(value):
+    """解析 "bytes 起始-结束/总大小"，返回 (起始字节, 总大小)，总大小未知时为0"""
+    match = CONTENT_RANGE_PATTERN.match(value or "")
+    if not match:
+        return None, 0
+    return int(match.group(1)), int(match.group(2)) if match.group(2) != "*" else 0
+
+
+class PdfCheck:
+    """边写边校验PDF：累计长度、文件头%PDF-、末尾%%EOF和SHA-256"""
+    TRAILER_WINDOW = 1024
+
+    def __init__(self, expected_size=0):
+        self.expected_size = expected_size
+        self.size = 0
+        self.head = b""
+        self.tail = b""
+        self.sha256 = hashlib.sha256()
+
+    def update(self, chunk):
+        self.sha256.update(chunk)
+        self.size += len(chunk)
+        if len(self.head) < 5:
+            self.head = (self.head + chunk[:5])[:5]
+        self.tail = (self.tail + chunk[-self.TRAILER_WINDOW:])[-self.TRAILER_WINDOW:]
+
+    def update_file(self, path, block_size=1024 * 1024):
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                self.update(block)
+        return self
+
+    def error(self):
+        """校验失败的原因，通过时返回None"""
+        if self.expected_size and self.size != self.expected_size:
+            return f"长度不符 {self.size}/{self.expected_size}"
+        if not self.head.startswith(b"%PDF-"):
+            return "缺少PDF文件头"
+        if b"%%EOF" not in self.tail:
+            return "缺少%%EOF结尾"
+        return None
+
+    def truncated(self):
+        return bool(self.expected_size) and self.size < self.expected_size
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+
+def verify_pdf_file(path):
+    """读取磁盘上的文件做同样的校验，返回PdfCheck"""
+    return PdfCheck().update_file(path)
+
+
+class SegmentPlan:
+    """分段下载计划：每段的起止位置和已下载字节数保存在.parts旁路文件中，中断后各段从停下的位置继续
+
+    旁路文件只记录已刷到磁盘的字节数（durable），崩溃后不会相信还在缓冲区里、没有真正写入的区间
+    """
+
+    def __init__(self, parts_file, url, total_size, segments):
+        self.parts_file = parts_file
+        self.url = url
+        self.total_size = total_size
+        self.segments = segments  # [[起始字节, 结束字节(含), 已下载字节数]]
+        self.durable = [segment[2] for segment in segments]  # 各段已落盘的字节数
+        self.lock = threading.Lock()
+        self.last_save = 0
+
+    @classmethod
+    def create(cls, parts_file, url, total_size, segment_size):
+        segments = [[start, min(start + segment_size, total_size) - 1, 0]
+                    for start in range(0, total_size, segment_size)]
+        return cls(parts_file, url, total_size, segments)
+
+    @classmethod
+    def load(cls, parts_file, url):
+        """读取旁路文件，URL不一致或内容损坏时返回None"""
+        try:
+            with open(parts_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("url") != url:
+                return None
+            return cls(parts_file, url, int(data["size"]), [list(map(int, s)) for s in data["segments"]])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, force=False):
+        """保存进度，未强制时最多每秒写一次"""
+        with self.lock:
+            now = time.time()
+            if not force and now - self.last_save < 1:
+                return
+            self.last_save = now
+            data = {"url": self.url, "size": self.total_size,
+                    "segments": [[start, end, durable] for (start, end, _), durable
+                                 in zip(self.segments, self.durable)]}
+        temp = f"{self.parts_file}.new"
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(temp, self.parts_file)
+
+    def advance(self, index, length):
+        with self.lock:
+            self.segments[index][2] += length
+
+    def sync(self, index, f):
+        """把该段的写入刷到磁盘，之后保存的进度才包含这些字节"""
+        f.flush()
+        os.fsync(f.fileno())
+        with self.lock:
+            self.durable[index] = self.segments[index][2]
+
+    def remaining(self, index):
+        start, end, done = self.segments[index]
+        return end - start + 1 - done
+
+    def pending(self):
+        return [i for i in range(len(self.segments)) if self.remaining(i) > 0]
+
+    def downloaded(self):
+        with self.lock:
+            return sum(done for _, _, done in self.segments)
+
+    def remove(self):
+        try:
+            os.remove(self.parts_file)
+        except OSError:
+            pass
+
+
+class PdfFetcher:
+    """PDF下载引擎：共享连接池的会话，按主机限制并发连接数，支持.tmp断点续传，下载结果校验后记入清单"""
+    HEADERS = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.110 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+    }
+
+    def __init__(self, config, rate_control=None, manifest=None, proxy_pool=None):
+        self.config = config
+        self.rate_control = rate_control
+        self.manifest = manifest
+        self.proxy_pool = proxy_pool
+        self.logger = logging.getLogger("PdfFetcher")
+        self.per_host_limit = max(1, int(config.get("max_connections_per_host", 4)))
+        # 超过该大小且服务器支持Range时分段并行下载
+        self.segment_threshold = int(config.get("segment_threshold_mb", 16) * 1024 * 1024)
+        self.segment_size = max(1, int(config.get("segment_size_mb", 8) * 1024 * 1024))
+        self.segment_connections = max(1, int(config.get("segment_connections", 4)))
+        self._host_slots = {}
+        self._slots_lock = threading.Lock()
+
+        # 几乎所有文件来自同一主机，连接池大小与并发下载数一致，保证长连接复用
+        pool_size = max(self.per_host_limit, int(config.get("download_workers", 4)))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(self.HEADERS)
+
+        # 设置代理：有代理池时每个下载连接从池中选取，否则使用单个代理
+        if self.proxy_pool is None and self.config.get("proxy"):
+            self.session.proxies = requests_proxies(self.config.get("proxy"))
+
+    def host_slot(self, url):
+        """获取目标主机的并发连接信号量"""
+        host = urlsplit(url).netloc
+        with self._slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def fetch(self, pdf_url, file_path, label=None, report=None, is_running=None):
+        """下载PDF到file_path，返回 (是否成功, HTTP状态码)"""
+        label = label or os.path.basename(file_path)
+        report = report or (lambda message: None)
+        is_running = is_running or (lambda: True)
+        with self.host_slot(pdf_url):
+            if self.proxy_pool is None:
+                return self._fetch(pdf_url, file_path, label, report, is_running)
+
+            # 同一个下载线程固定使用同一个代理；网络错误和限流计为代理失败，
+            # 服务器正常返回的HTTP错误和校验失败与代理无关，不计入
+            proxy = self.proxy_pool.acquire(threading.current_thread().name, is_running)
+            if proxy is None:
+                return False, None
+            started = time.perf_counter()
+            ok, status = False, None
+            try:
+                ok, status = self._fetch(pdf_url, file_path, label, report, is_running, proxy)
+            finally:
+                if ok:
+                    proxy_ok = True
+                elif status is None and is_running():
+                    proxy_ok = False
+                else:
+                    proxy_ok = None
+                self.proxy_pool.release(proxy, proxy_ok, time.perf_counter() - started if ok else None)
+            return ok, status
+
+    def _fetch(self, pdf_url, file_path, label, report, is_running, proxy=None):
+        temp_file_path = f"{file_path}.tmp"
+        parts_file = f"{file_path}.parts"
+        headers = {}
+        timeout = self.config.get("timeout", 30)
+        resume = self.config.get("resume_download", True)
+
+        try:
+            # 上次分段下载未完成时按各段进度继续
+            if resume and os.path.exists(parts_file) and os.path.exists(temp_file_path):
+                plan = SegmentPlan.load(parts_file, pdf_url)
+                if plan and os.path.getsize(temp_file_path) == plan.total_size:
+                    report(f"分段断点续传: {label} 已完成 {plan.downloaded()}/{plan.total_size} 字节")
+                    return self._fetch_segments(pdf_url, file_path, plan, label, report, is_running, proxy)
+            if os.path.exists(parts_file):
+                # 旁路文件与临时文件对不上，丢弃后重新下载
+                for stale in (parts_file, temp_file_path):
+                    if os.path.exists(stale):
+                        os.remove(stale)
+
+            # 检查是否已存在临时文件，用于断点续传
+            file_size = 0
+            if os.path.exists(temp_file_path) and resume:
+                file_size = os.path.getsize(temp_file_path)
+                report(f"断点续传: {label} 从 {file_size} 字节开始")
+
+            if self.rate_control and self.rate_control.acquire(pdf_url, is_running, download=True) is None:
+                return False, None
+
+            # 不再单独发HEAD：总是带Range发GET，从Content-Range或Content-Length得到文件大小，
+            # 206响应同时说明服务器支持分段下载
+            headers['Range'] = f'bytes={file_size}-'
+            with self.session.get(pdf_url, headers=headers, stream=True, timeout=timeout,
+                                  proxies=requests_proxies(proxy)) as response:
+                if response.status_code == 416 and file_size > 0:
+                    # 临时文件已不小于服务器上的文件，丢弃后从头下载
+                    os.remove(temp_file_path)
+                    return self._fetch(pdf_url, file_path, label, report, is_running, proxy)
+                if response.status_code == 206:  # 部分内容
+                    range_start, total_size = parse_content_range(response.headers.get('content-range'))
+                    if range_start != file_size:
+                        report(f"下载失败，服务器返回的区间不符: {label}")
+                        return False, response.status_code
+                    if file_size > 0:
+                        mode = 'ab'  # 追加二进制模式
+                        report(f"断点续传中: {label}")
+                    else:
+                        mode = 'wb'
+                        report(f"开始下载: {label}")
+                elif response.status_code == 200:  # 完整内容
+                    mode = 'wb'  # 写入二进制模式
+                    file_size = 0
+                    total_size = int(response.headers.get('content-length', 0))
+                    report(f"开始下载: {label}")
+                else:
+                    if response.status_code in (429, 503):
+                        raise RateLimited(f"HTTP {response.status_code}")
+                    report(f"下载失败 HTTP {response.status_code}: {label}")
+                    return False, response.status_code
+                if self.rate_control:
+                    self.rate_control.success(pdf_url)
+
+                # 大文件分段并行下载，这次请求直接作为第一段使用，小文件仍然单连接
+                if file_size == 0 and response.status_code == 206 and total_size >= self.segment_threshold:
+                    plan = SegmentPlan.create(parts_file, pdf_url, total_size, self.segment_size)
+                    with open(temp_file_path, 'wb') as f:
+                        f.truncate(total_size)
+                    plan.save(force=True)
+                    report(f"分段下载: {label} ({total_size // 1024} KB, {len(plan.segments)} 段)")
+                    return self._fetch_segments(pdf_url, file_path, plan, label, report, is_running,
+                                                proxy, first_response=response)
+
+                # 边写边校验，续传时先把已下载的部分计入
+                check = PdfCheck(total_size)
+                if mode == 'ab':
+                    check.update_file(temp_file_path)
+
+                # 写入文件
+                chunk_size = self.config.get("chunk_size", 8192)
+                downloaded = file_size
+                start_time = time.time()
+                last_update_time = start_time
+
+                with open(temp_file_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if not is_running():
+                            return False, response.status_code
+                        if chunk:
+                            f.write(chunk)
+                            check.update(chunk)
+                            downloaded += len(chunk)
+
+                            # 每秒更新一次下载进度
+                            current_time = time.time()
+                            if current_time - last_update_time > 1:
+                                if total_size > 0:
+                                    progress = int(downloaded / total_size * 100)
+                                    speed = (downloaded - file_size) / (current_time - start_time) / 1024  # KB/s
+                                    report(f"下载中: {label} - {progress}% ({speed:.1f} KB/s)")
+                                last_update_time = current_time
+                status_code = response.status_code
+
+            return self._finish(pdf_url, file_path, check, label, report), status_code
+
+        except RateLimited as e:
+            if self.rate_control:
+                self.rate_control.throttle(pdf_url, str(e))
+            report(f"下载被限流 {e}: {label}")
+            return False, None
+        except requests.exceptions.Timeout:
+            if self.rate_control:
+                self.rate_control.throttle(pdf_url, "超时")
+            report(f"下载超时: {label}")
+            self.logger.warning(f"下载超时: {label}")
+            return False, None
+        except requests.exceptions.ConnectionError:
+            report(f"网络连接错误: {label}")
+            self.logger.warning(f"网络连接错误: {label}")
+            return False, None
+        except Exception as e:
+            report(f"下载错误: {str(e)}")
+            self.logger.error(f"下载错误: {str(e)}")
+            return False, None
+
+    def _fetch_segments(self, pdf_url, file_path, plan, label, report, is_running, proxy=None,
+                        first_response=None):
+        """多个连接并行下载未完成的段，写入预分配好的.tmp文件的对应位置"""
+        temp_file_path = f"{file_path}.tmp"
+        pending = plan.pending()
+        if first_response is not None:
+            pending.remove(0)
+        state = {"error": None, "status": 206}
+        state_lock = threading.Lock()
+        failures = {}  # 段号 -> 中断次数
+        max_retries = max(1, int(self.config.get("retry_count", 3)))
+        start_time = time.time()
+        start_bytes = plan.downloaded()
+        last_report = [start_time]
+
+        def progress():
+            now = time.time()
+            with state_lock:
+                if now - last_report[0] <= 1:
+                    return
+                last_report[0] = now
+            downloaded = plan.downloaded()
+            speed = (downloaded - start_bytes) / (now - start_time) / 1024  # KB/s
+            report(f"下载中: {label} - {int(downloaded / plan.total_size * 100)}% ({speed:.1f} KB/s)")
+
+        def fetch(index, response=None):
+            """下载一段；连接中断、数据不完整或被限流时该段放回队列，从已写入的位置重试"""
+            try:
+                self._fetch_segment(pdf_url, temp_file_path, plan, index, is_running, progress, proxy, response)
+            except (IOError, RateLimited) as e:
+                if isinstance(e, RateLimited) and self.rate_control:
+                    self.rate_control.throttle(pdf_url, str(e))
+                with state_lock:
+                    failures[index] = failures.get(index, 0) + 1
+                    if failures[index] > max_retries:
+                        raise
+                    pending.append(index)
+                report(f"分段{index + 1}中断，重试({failures[index]}/{max_retries}): {label}")
+
+        def worker(slot, response=None):
+            try:
+                if response is not None:
+                    fetch(0, response)
+                while is_running():
+                    with state_lock:
+                        if state["error"] or not pending:
+                            return
+                        index = pending.pop(0)
+                    fetch(index)
+            except Exception as e:
+                with state_lock:
+                    state["error"] = state["error"] or e
+            finally:
+                if slot:
+                    slot.release()
+                    if proxy is not None:
+                        self.proxy_pool.release(proxy)
+
+        # 当前下载已占用一个主机连接，额外的段连接只在主机和代理都还有空闲连接时才启动
+        host_slot = self.host_slot(pdf_url)
+        threads = []
+        for _ in range(min(self.segment_connections, len(pending)) - 1):
+            if not host_slot.acquire(blocking=False):
+                break
+            if proxy is not None and not self.proxy_pool.try_acquire(proxy):
+                host_slot.release()
+                break
+            thread = threading.Thread(target=worker, args=(host_slot,), daemon=True)
+            thread.start()
+            threads.append(thread)
+        worker(None, first_response)
+        for thread in threads:
+            thread.join()
+        plan.save(force=True)
+
+        error = state["error"]
+        if error is not None:
+            raise error
+        if plan.pending():
+            # 已停止，保留.tmp和.parts供下次续传
+            return False, state["status"]
+
+        # 各段乱序写入，无法边写边算摘要，完成后整体读一遍校验
+        plan.remove()
+        check = PdfCheck(plan.total_size).update_file(temp_file_path)
+        return self._finish(pdf_url, file_path, check, label, report), state["status"]
+
+    def _finish(self, pdf_url, file_path, check, label, report):
+        """校验通过后改为正式文件名并记入清单；数据不完整时保留.tmp供续传，内容损坏则删除"""
+        temp_file_path = f"{file_path}.tmp"
+        error = check.error()
+        if error:
+            if not check.truncated() and os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+            report(f"下载校验失败({error}): {label}")
+            self.logger.warning(f"下载校验失败({error}): {label}")
+            return False
+
+        # 下载完成后重命名文件
+        os.replace(temp_file_path, file_path)
+        if self.manifest:
+            self.manifest.record(file_path, check.hexdigest(), url=pdf_url)
+        report(f"已下载: {label}")
+        return True
+
+    def _fetch_segment(self, pdf_url, temp_file_path, plan, index, is_running, progress, proxy=None,
+                       response=None):
+        """下载一段剩余的字节，response为已打开的请求时直接读取"""
+        start, end, done = plan.segments[index]
+        opened = response is None
+        if opened:
+            if self.rate_control and self.rate_control.acquire(pdf_url, is_running, download=True) is None:
+                return
+            headers = {'Range': f'bytes={start + done}-{end}'}
+            timeout = self.config.get("timeout", 30)
+            response = self.session.get(pdf_url, headers=headers, stream=True, timeout=timeout,
+                                        proxies=requests_proxies(proxy))
+        chunk_size = self.config.get("chunk_size", 8192)
+        with response:
+            if response.status_code in (429, 503):
+                raise RateLimited(f"HTTP {response.status_code}")
+            if response.status_code != 206:
+                raise IOError(f"分段请求未返回部分内容 HTTP {response.status_code}")
+            if opened and self.rate_control:
+                self.rate_control.success(pdf_url)
+            with open(temp_file_path, 'r+b') as f:
+                f.seek(start + done)
+                last_sync = time.time()
+                try:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if not is_running():
+                            return
+                        if chunk:
+                            chunk = chunk[:plan.remaining(index)]
+                            f.write(chunk)
+                            plan.advance(index, len(chunk))
+                            progress()
+                            if plan.remaining(index) <= 0:
+                                return
+                            # 每秒落盘一次再保存进度，保存的区间一定已写入磁盘
+                            if time.time() - last_sync >= 1:
+                                plan.sync(index, f)
+                                plan.save()
+                                last_sync = time.time()
+                finally:
+                    plan.sync(index, f)
+        if plan.remaining(index) > 0:
+            raise IOError(f"分段下载不完整: {start + done}-{end}")
+
+    def close(self):
+        self.session.close()
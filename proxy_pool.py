@@ -0,0 +1,190 @@
+import re
+import time
+import logging
+import threading
+
+PROXY_SEPARATOR = re.compile(r'[\s,;]+')
+
+
+def parse_proxies(value):
+    """代理配置可以是单个地址、逗号/分号/换行分隔的字符串或列表"""
+    if not value:
+        return []
+    items = value if isinstance(value, (list, tuple)) else PROXY_SEPARATOR.split(value)
+    proxies = []
+    for item in items:
+        item = item.strip()
+        if item and item not in proxies:
+            proxies.append(item)
+    return proxies
+
+
+def proxy_url(address):
+    return address if "://" in address else f"http://{address}"
+
+
+def requests_proxies(address):
+    """requests使用的代理字典"""
+    if not address:
+        return None
+    return {"http": proxy_url(address), "https": proxy_url(address)}
+
+
+class ProxyState:
+    """单个代理的并发数、延迟和失败统计"""
+
+    def __init__(self, address, max_active):
+        self.address = address
+        self.max_active = max_active
+        self.active = 0
+        self.latency = None  # 指数滑动平均（秒）
+        self.failures = 0  # 连续失败次数
+        self.successes = 0
+        self.total_failures = 0
+        self.ejected_until = 0.0
+
+    def admitted(self, now):
+        return self.ejected_until <= now
+
+    def available(self, now):
+        return self.admitted(now) and self.active < self.max_active
+
+    def score(self):
+        """越小越好：延迟高、连续失败多、正在使用的连接多都会降低优先级"""
+        return (self.latency or 1.0) * (1 + self.failures) * (1 + self.active / self.max_active)
+
+
+class ProxyPool:
+    """代理池：限制每个代理的并发数，按延迟和失败情况打分，连续失败的代理暂时剔除，
+    冷却期过后以观察状态重新启用；同一个键（浏览器工作线程、下载连接）尽量固定使用同一个代理"""
+
+    def __init__(self, proxies, max_active=16, eject_after=3, eject_seconds=300, smoothing=0.3):
+        self.states = {address: ProxyState(address, max(1, max_active)) for address in proxies}
+        self.eject_after = max(1, eject_after)
+        self.eject_seconds = eject_seconds
+        self.smoothing = smoothing
+        self.logger = logging.getLogger("ProxyPool")
+        self._sticky = {}  # 键 -> 代理地址
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config):
+        """根据配置创建代理池，未配置代理时返回None"""
+        proxies = parse_proxies(config.get("proxy"))
+        if not proxies:
+            return None
+        return cls(proxies,
+                   max_active=config.get("proxy_max_connections", 16),
+                   eject_after=config.get("proxy_eject_failures", 3),
+                   eject_seconds=config.get("proxy_eject_seconds", 300))
+
+    def _readmit(self, now):
+        """冷却期已过的代理重新启用，连续失败数置为剔除阈值减一，再失败一次立即剔除"""
+        for state in self.states.values():
+            if state.ejected_until and state.ejected_until <= now:
+                state.ejected_until = 0.0
+                state.failures = self.eject_after - 1
+                self.logger.info(f"代理重新启用: {state.address}")
+
+    def _choose(self, key, now, need_slot=True):
+        usable = (lambda state: state.available(now)) if need_slot else (lambda state: state.admitted(now))
+        address = self._sticky.get(key)
+        if address and usable(self.states[address]):
+            return self.states[address]
+        candidates = [state for state in self.states.values() if usable(state)]
+        if candidates:
+            return min(candidates, key=lambda state: state.score())
+        if not any(state.admitted(now) for state in self.states.values()):
+            # 全部被剔除时不能停摆，提前启用最早到期的代理
+            earliest = min(self.states.values(), key=lambda state: state.ejected_until)
+            earliest.ejected_until = now
+            self._readmit(now)
+            return earliest if usable(earliest) else None
+        return None
+
+    def acquire(self, key=None, is_running=None):
+        """占用一个代理连接，必要时等待空闲；被停止时返回None"""
+        with self._cond:
+            while True:
+                now = time.time()
+                self._readmit(now)
+                state = self._choose(key, now)
+                if state is not None:
+                    state.active += 1
+                    if key is not None:
+                        self._sticky[key] = state.address
+                    return state.address
+                if is_running and not is_running():
+                    return None
+                self._cond.wait(0.5)
+
+    def assign(self, key=None):
+        """为浏览器选择一个代理，不占用连接数：浏览器启动后代理固定，只通过report反馈结果"""
+        with self._cond:
+            now = time.time()
+            self._readmit(now)
+            state = self._choose(key, now, need_slot=False)
+            if key is not None:
+                self._sticky[key] = state.address
+            return state.address
+
+    def try_acquire(self, address):
+        """不等待地在指定代理上再占用一个连接，用于分段下载的附加连接"""
+        with self._cond:
+            state = self.states.get(address)
+            if state is None or not state.available(time.time()):
+                return False
+            state.active += 1
+            return True
+
+    def release(self, address, ok=None, latency=None):
+        """释放连接并记录结果；ok为None表示结果与代理无关（如被停止）"""
+        with self._cond:
+            state = self.states.get(address)
+            if state is None:
+                return
+            state.active = max(0, state.active - 1)
+            self._record(state, ok, latency)
+            self._cond.notify_all()
+
+    def report(self, address, ok, latency=None):
+        """记录一次请求结果而不改变占用数，用于assign分配给浏览器的代理"""
+        with self._cond:
+            state = self.states.get(address)
+            if state is not None:
+                self._record(state, ok, latency)
+                self._cond.notify_all()
+
+    def _record(self, state, ok, latency):
+        if ok is None:
+            return
+        if ok:
+            state.successes += 1
+            state.failures = 0
+            if latency is not None:
+                state.latency = latency if state.latency is None else (
+                    self.smoothing * latency + (1 - self.smoothing) * state.latency)
+            return
+        state.failures += 1
+        state.total_failures += 1
+        # 失败后解除固定分配，重试时按分数重新选择，不必等到该代理被剔除
+        for key in [k for k, v in self._sticky.items() if v == state.address]:
+            del self._sticky[key]
+        if state.failures >= self.eject_after and state.admitted(time.time()):
+            state.ejected_until = time.time() + self.eject_seconds
+            self.logger.warning(f"代理连续失败 {state.failures} 次，暂停使用 {self.eject_seconds} 秒: {state.address}")
+
+    def is_admitted(self, address):
+        with self._cond:
+            state = self.states.get(address)
+            return state is not None and state.admitted(time.time())
+
+    def summary(self):
+        with self._cond:
+            now = time.time()
+            parts = []
+            for state in self.states.values():
+                latency = f"{state.latency:.2f}s" if state.latency is not None else "-"
+                flag = "" if state.admitted(now) else " 已剔除"
+                parts.append(f"{state.address} {latency} 成功{state.successes}/失败{state.total_failures}{flag}")
+            return ", ".join(parts)
@@ -0,0 +1,140 @@
+import time
+import logging
+import threading
+from urllib.parse import urlsplit
+
+
+class RateLimited(Exception):
+    """远端限流（429、人机验证页、超时），调用方应退避后重试"""
+
+
+class AdaptiveRateLimiter:
+    """令牌桶限速器，按AIMD调整速率：正常响应线性加速，被限流时成倍减速"""
+
+    def __init__(self, name, rate, min_rate=0.05, max_rate=10.0, burst=3,
+                 increase=0.1, decrease=0.5, throttle_cooldown=2.0):
+        self.name = name
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = max(1, burst)
+        self.increase = increase
+        self.decrease = decrease
+        self.throttle_cooldown = throttle_cooldown
+        self._rate = min(max(rate, min_rate), max_rate)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._last_throttle = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self._rate)
+        self._updated = now
+
+    def acquire(self, is_running=None):
+        """取一个令牌，必要时等待；返回等待秒数，被停止时返回None"""
+        start = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return now - start
+                wait = (1 - self._tokens) / self._rate
+            if is_running and not is_running():
+                return None
+            # 分段等待，速率变化和停止请求能及时生效
+            time.sleep(min(wait, 0.5))
+
+    def on_success(self):
+        """正常响应：加性增加速率"""
+        with self._lock:
+            self._rate = min(self.max_rate, self._rate + self.increase)
+            return self._rate
+
+    def on_throttle(self):
+        """被限流：乘性降低速率并清空令牌桶，同一冷却期内只降一次"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_throttle >= self.throttle_cooldown:
+                self._last_throttle = now
+                self._rate = max(self.min_rate, self._rate * self.decrease)
+                self._refill(now)
+                self._tokens = min(self._tokens, 0.0)
+            return self._rate
+
+
+class RateControl:
+    """所有解析器和下载器共用的限速中心，按主机维护自适应限速器"""
+
+    def __init__(self, config, on_change=None, metrics=None):
+        self.config = config
+        self.on_change = on_change
+        self.metrics = metrics
+        self.logger = logging.getLogger("RateControl")
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url, download=False):
+        """按主机取限速器，首次请求时创建：页面主机以原先的固定延时作为初始请求间隔，
+        PDF文件主机从单独的初始速率开始，不受页面延时拖累，被限流后同样按AIMD降速"""
+        host = urlsplit(url).netloc or url
+        with self._lock:
+            if host not in self._limiters:
+                if download:
+                    rate = float(self.config.get("download_rate", 10.0))
+                else:
+                    rate = 1.0 / max(0.1, float(self.config.get("delay", 5)))
+                self._limiters[host] = AdaptiveRateLimiter(
+                    host,
+                    rate=rate,
+                    min_rate=self.config.get("rate_min", 0.05),
+                    max_rate=self.config.get("rate_max", 10.0),
+                    burst=self.config.get("rate_burst", 3),
+                    increase=self.config.get("rate_increase", 0.1),
+                    decrease=self.config.get("rate_decrease", 0.5),
+                )
+            return self._limiters[host]
+
+    def acquire(self, url, is_running=None, download=False):
+        wait = self.limiter(url, download).acquire(is_running)
+        if self.metrics and wait is not None:
+            self.metrics.observe("rate_wait", wait)
+        return wait
+
+    def success(self, url):
+        self.limiter(url).on_success()
+        self._notify()
+
+    def throttle(self, url, reason):
+        limiter = self.limiter(url)
+        rate = limiter.on_throttle()
+        if self.metrics:
+            self.metrics.count("throttled")
+        self.logger.warning(f"{limiter.name} 被限流({reason})，速率降至 {rate:.2f}/s")
+        self._notify()
+
+    def summary(self):
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return ", ".join(f"{limiter.name} {limiter.rate:.2f}/s" for limiter in limiters)
+
+    def _notify(self):
+        if self.on_change:
+            self.on_change(self.summary())
+
+
+# 人机验证/限流页面的特征
+BOT_CHECK_MARKERS = ("unusual traffic", "not a robot", "captcha")
+
+
+def looks_like_bot_check(url, text=""):
+    """根据地址和页面文字判断是否落到了人机验证页"""
+    if "/sorry/" in (url or ""):
+        return True
+    lowered = (text or "")[:5000].lower()
+    return any(marker in lowered for marker in BOT_CHECK_MARKERS)
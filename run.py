@@ -1,9 +1,13 @@
 import sys
 import os
-import import_modules  # 导入所有必要的模块
 from PyQt5.QtWidgets import QApplication
 from main import PatentBrowser
 
+def collect_modules_for_packager():
+    """仅供打包工具静态分析依赖，运行时不调用；重依赖在首次使用时才导入"""
+    import import_modules  # 导入所有必要的模块
+    import downloader
+
 if __name__ == '__main__':
     # 确保工作目录正确
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
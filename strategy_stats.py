@@ -0,0 +1,116 @@
+import os
+import json
+import logging
+import threading
+from patent_ids import normalize_patent_id, split_patent_id
+
+# 策略1-4从同一次搜索页加载中取链接，耗时主要是这次加载，作为一个整体统计和排序
+SEARCH_PAGE_STRATEGIES = (1, 2, 3, 4)
+SEARCH_PAGE_KEY = "1-4"
+
+
+def stats_key(strategy_num):
+    return SEARCH_PAGE_KEY if strategy_num in SEARCH_PAGE_STRATEGIES else str(strategy_num)
+
+
+class Resolution:
+    """一个专利的一次解析过程：策略1-4合并为一次尝试（耗时相加，任一成功即成功），在close时记录"""
+
+    def __init__(self, stats, patent):
+        self.stats = stats
+        self.patent = patent
+        self.search_page = None  # [耗时, 是否成功]
+
+    def record(self, strategy_num, elapsed, success):
+        if strategy_num not in SEARCH_PAGE_STRATEGIES:
+            self.stats.record(self.patent, strategy_num, elapsed, success)
+            return
+        if self.search_page is None:
+            self.search_page = [0.0, False]
+        self.search_page[0] += elapsed
+        self.search_page[1] = self.search_page[1] or success
+
+    def close(self):
+        if self.search_page is not None:
+            self.stats.record(self.patent, SEARCH_PAGE_KEY, *self.search_page)
+            self.search_page = None
+
+
+class StrategyStats:
+    """按国家码/类型码前缀统计各策略的成功率和耗时，按预期成功耗时排序策略；策略1-4记为一项"1-4"，整体排序"""
+    PRIOR_TIME = 5.0  # 没有记录时假设每次尝试耗时（秒）
+    SAVE_EVERY = 20
+
+    def __init__(self, download_dir):
+        self.stats_file = os.path.join(download_dir, "strategy_stats.json")
+        self.logger = logging.getLogger("StrategyStats")
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self.stats = self.load()
+
+    def load(self):
+        try:
+            if os.path.exists(self.stats_file):
+                with open(self.stats_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            self.logger.error(f"加载策略统计失败: {str(e)}")
+        return {}
+
+    def save(self):
+        """原子写入统计文件"""
+        with self._lock:
+            snapshot = json.dumps(self.stats, ensure_ascii=False, indent=4)
+            self._dirty = 0
+        try:
+            temp_file = f"{self.stats_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(snapshot)
+            os.replace(temp_file, self.stats_file)
+        except Exception as e:
+            self.logger.error(f"保存策略统计失败: {str(e)}")
+
+    @staticmethod
+    def prefix(patent):
+        """专利号前缀，如 CN112345678U -> CN-U，US5123456A -> US-A"""
+        canonical = normalize_patent_id(patent) or ""
+        parts = split_patent_id(canonical)
+        if not parts:
+            return canonical[:2]
+        country, _, kind = parts
+        return f"{country}-{kind}"
+
+    def resolution(self, patent):
+        """开始记录一个专利的解析过程"""
+        return Resolution(self, patent)
+
+    def record(self, patent, strategy_num, elapsed, success):
+        """记录一次策略尝试，strategy_num也可以是合并项的键"""
+        prefix = self.prefix(patent)
+        with self._lock:
+            entry = self.stats.setdefault(prefix, {}).setdefault(
+                str(strategy_num), {"attempts": 0, "successes": 0, "time": 0.0})
+            entry["attempts"] += 1
+            entry["successes"] += 1 if success else 0
+            entry["time"] += elapsed
+            self._dirty += 1
+            should_save = self._dirty >= self.SAVE_EVERY
+        if should_save:
+            self.save()
+
+    def expected_time(self, prefix, strategy_num):
+        """预期成功耗时 = 平均单次耗时 / 成功率（均做平滑）"""
+        with self._lock:
+            entry = self.stats.get(prefix, {}).get(str(strategy_num))
+            attempts = entry["attempts"] if entry else 0
+            successes = entry["successes"] if entry else 0
+            total_time = entry["time"] if entry else 0.0
+        mean_time = (total_time + self.PRIOR_TIME) / (attempts + 1)
+        success_rate = (successes + 1) / (attempts + 2)
+        return mean_time / success_rate
+
+    def order(self, patent, strategies):
+        """按预期成功耗时对 (策略号, 策略) 列表排序，无记录时保持原顺序；
+        策略1-4的预期耗时相同，稳定排序使它们保持原有的相对顺序并连在一起"""
+        prefix = self.prefix(patent)
+        return sorted(strategies, key=lambda item: self.expected_time(prefix, stats_key(item[0])))
@@ -0,0 +1,84 @@
+import os
+import time
+import logging
+import threading
+from history_store import connect
+
+
+class UrlCache:
+    """专利号到PDF链接的持久缓存，带过期时间和容量淘汰，与下载目录无关"""
+
+    def __init__(self, cache_file, ttl_hours=168, max_entries=200000):
+        self.ttl = ttl_hours * 3600
+        self.max_entries = max_entries
+        self.logger = logging.getLogger("UrlCache")
+        self._lock = threading.Lock()
+        cache_file = os.path.abspath(cache_file)
+        self.conn = connect(os.path.dirname(cache_file), os.path.basename(cache_file))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS url_cache (
+                patent TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                strategy INTEGER,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_url_cache_last_used ON url_cache (last_used)")
+        self.conn.commit()
+        self.evict()
+
+    def get(self, patent):
+        """返回未过期的 (PDF链接, 策略号)，没有则返回 (None, None)"""
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT url, strategy, created FROM url_cache WHERE patent = ?", (patent,)
+            ).fetchone()
+            if row is None:
+                return None, None
+            if now - row[2] > self.ttl:
+                self.conn.execute("DELETE FROM url_cache WHERE patent = ?", (patent,))
+                self.conn.commit()
+                return None, None
+            self.conn.execute("UPDATE url_cache SET last_used = ? WHERE patent = ?", (now, patent))
+            self.conn.commit()
+        return row[0], row[1]
+
+    def put(self, patent, url, strategy=None):
+        now = time.time()
+        with self._lock:
+            self.conn.execute("""
+                INSERT INTO url_cache (patent, url, strategy, created, last_used) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(patent) DO UPDATE SET
+                    url = excluded.url, strategy = excluded.strategy,
+                    created = excluded.created, last_used = excluded.last_used
+            """, (patent, url, strategy, now, now))
+            self.conn.commit()
+
+    def invalidate(self, patent):
+        with self._lock:
+            self.conn.execute("DELETE FROM url_cache WHERE patent = ?", (patent,))
+            self.conn.commit()
+        self.logger.info(f"缓存链接已失效: {patent}")
+
+    def evict(self):
+        """删除过期条目，超出容量时按最近使用时间淘汰"""
+        with self._lock:
+            self.conn.execute("DELETE FROM url_cache WHERE created < ?", (time.time() - self.ttl,))
+            count = self.conn.execute("SELECT COUNT(*) FROM url_cache").fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute("""
+                    DELETE FROM url_cache WHERE patent IN (
+                        SELECT patent FROM url_cache ORDER BY last_used LIMIT ?
+                    )
+                """, (count - self.max_entries,))
+            self.conn.commit()
+
+    def close(self):
+        try:
+            self.evict()
+            with self._lock:
+                self.conn.close()
+        except Exception as e:
+            self.logger.error(f"关闭链接缓存失败: {str(e)}")